@@ -4,20 +4,59 @@ import logging
 from aiogram import Bot, Dispatcher
 from aiogram.types import BotCommand, MenuButtonCommands
 from aiogram.fsm.storage.memory import MemoryStorage
-from handlers.pvp_quiz import router as pvp_router
+from handlers.pvp_quiz import (
+    router as pvp_router,
+    configure_matchmaking,
+    load_bot_username,
+    start_round_timers,
+)
 from handlers import campaign
 
-from config import BOT_TOKEN
+from config import (
+    BOT_TOKEN,
+    DAILY_KEEP_DAYS,
+    MATCHMAKING_POINTS_BAND,
+    PROGRESS_KEEP_DAYS,
+    SCORES_BACKEND,
+    SCORES_FLUSH_INTERVAL_SEC,
+    SCORES_FLUSH_EVERY,
+    STORAGE_FORMAT,
+    THROTTLE_BURST,
+    THROTTLE_DEDUPE_SEC,
+    THROTTLE_RATE_PER_SEC,
+)
 from handlers import start, games_menu, tf_game, profile, leaderboard, ask_economist
 from handlers.quiz_game import router as quiz_router
+from middlewares.throttling import ThrottlingMiddleware
+from services import maintenance
+from services.storage import configure_store
+from services.throttle import FloodGuard
 
 logging.basicConfig(level=logging.INFO)
 
 async def main():
     bot = Bot(token=BOT_TOKEN)
 
+    configure_store(
+        flush_interval=SCORES_FLUSH_INTERVAL_SEC,
+        flush_every=SCORES_FLUSH_EVERY,
+        backend=SCORES_BACKEND,
+        storage_format=STORAGE_FORMAT,
+    )
+    maintenance.startup(daily_keep_days=DAILY_KEEP_DAYS, progress_keep_days=PROGRESS_KEEP_DAYS)
+    configure_matchmaking(MATCHMAKING_POINTS_BAND)
+
     dp = Dispatcher(storage=MemoryStorage())
 
+    # лишние нажатия отсекаем до хендлеров (и до хранилища); лимит общий на оба типа событий
+    throttling = ThrottlingMiddleware(FloodGuard(
+        rate=THROTTLE_RATE_PER_SEC,
+        burst=THROTTLE_BURST,
+        dedupe_window=THROTTLE_DEDUPE_SEC,
+    ))
+    dp.message.outer_middleware(throttling)
+    dp.callback_query.outer_middleware(throttling)
+
     dp.include_router(start.router)
     dp.include_router(games_menu.router)
     dp.include_router(tf_game.router)
@@ -34,9 +73,18 @@ async def main():
         BotCommand(command="menu", description="Открыть главное меню"),
     ])
     await bot.set_chat_menu_button(menu_button=MenuButtonCommands())
+    # username для PvP-ссылок: один get_me() на весь запуск
+    await load_bot_username(bot)
 
     logging.info("✅ Starting polling...")
-    await dp.start_polling(bot)
+    jobs = maintenance.start_jobs(flush_interval=SCORES_FLUSH_INTERVAL_SEC)
+    # дедлайны раундов PvP, включая матчи, которые шли до рестарта
+    round_timers = start_round_timers(bot)
+    try:
+        await dp.start_polling(bot)
+    finally:
+        await round_timers.stop()
+        await maintenance.shutdown(jobs)
 
 if __name__ == "__main__":
     try:
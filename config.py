@@ -13,6 +13,28 @@ AI_MODEL = os.getenv("AI_MODEL", "gpt-5-mini")
 NEUROAPI_API_KEY = os.getenv("NEUROAPI_API_KEY")
 NEUROAPI_BASE_URL = os.getenv("NEUROAPI_BASE_URL")
 
+# Storage: "json" (scores.json в памяти + write-behind) или "sqlite" (storage/scores.sqlite3)
+SCORES_BACKEND = os.getenv("SCORES_BACKEND", "json")
+# формат файлов хранилища: "json", "orjson" или "msgpack" (читаются любые)
+STORAGE_FORMAT = os.getenv("STORAGE_FORMAT", "json")
+SCORES_FLUSH_INTERVAL_SEC = float(os.getenv("SCORES_FLUSH_INTERVAL_SEC", "5"))
+SCORES_FLUSH_EVERY = int(os.getenv("SCORES_FLUSH_EVERY", "100"))
+# сколько дней дневных очков держим в живом хранилище, остальное — в storage/archive
+DAILY_KEEP_DAYS = int(os.getenv("DAILY_KEEP_DAYS", "14"))
+# сколько дней (включая сегодня) храним прогресс «видел сегодня» по играм
+PROGRESS_KEEP_DAYS = {
+    "quiz": int(os.getenv("QUIZ_PROGRESS_KEEP_DAYS", "1")),
+    "tf": int(os.getenv("TF_PROGRESS_KEEP_DAYS", "1")),
+}
+
+# Антифлуд: событий в секунду на пользователя, запас подряд и окно отсева повторных нажатий
+THROTTLE_RATE_PER_SEC = float(os.getenv("THROTTLE_RATE_PER_SEC", "4"))
+THROTTLE_BURST = int(os.getenv("THROTTLE_BURST", "8"))
+THROTTLE_DEDUPE_SEC = float(os.getenv("THROTTLE_DEDUPE_SEC", "1"))
+
+# PvP-поиск: сначала соперник в той же полосе очков (и соседних), иначе любой ждущий; 0 — без полос
+MATCHMAKING_POINTS_BAND = int(os.getenv("MATCHMAKING_POINTS_BAND", "100"))
+
 if not BOT_TOKEN:
     raise RuntimeError("BOT_TOKEN не найден")
 
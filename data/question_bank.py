@@ -0,0 +1,51 @@
+import random
+from array import array
+from typing import Any, Dict, Iterator, Optional
+
+
+class QuestionBank:
+    """
+    Банк вопросов одной игры, проиндексированный при импорте:
+    id -> позиция и корзины позиций по сложности (points).
+    Поиск по id и выбор по сложности не перебирают банк.
+    """
+
+    def __init__(self, questions: list[Dict[str, Any]], default_points: int):
+        self.questions = questions
+        self.positions: dict[int, int] = {}
+        buckets: dict[int, array] = {}
+
+        for pos, q in enumerate(questions):
+            pts = int(q.get("points", default_points))
+            self.positions[int(q["id"])] = pos
+            buckets.setdefault(pts, array("H")).append(pos)
+
+        self._buckets = dict(sorted(buckets.items()))
+
+    def __len__(self) -> int:
+        return len(self.questions)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return iter(self.questions)
+
+    def at(self, pos: int) -> Dict[str, Any]:
+        return self.questions[pos]
+
+    def position(self, qid: int) -> Optional[int]:
+        return self.positions.get(int(qid))
+
+    @property
+    def size_by_difficulty(self) -> dict[int, int]:
+        return {pts: len(bucket) for pts, bucket in self._buckets.items()}
+
+    def sample(self, k: int, difficulty: Optional[int] = None, rng: Optional[random.Random] = None) -> list[Dict[str, Any]]:
+        """
+        k случайных вопросов без повторов (или сколько есть, если меньше).
+        difficulty — взять только вопросы с таким количеством очков.
+        """
+        if difficulty is None:
+            pool = range(len(self.questions))
+        else:
+            pool = self._buckets.get(int(difficulty), ())
+        picked = (rng or random).sample(pool, k=min(k, len(pool)))
+        return [self.questions[pos] for pos in picked]
@@ -1,8 +1,12 @@
 import json
 from pathlib import Path
 
+from data.question_bank import QuestionBank
+
 _here = Path(__file__).resolve().parent
 _path = _here / "quiz_questions.json"
 
 with _path.open("r", encoding="utf-8") as f:
-    QUIZ_QUESTIONS = json.load(f)
\ No newline at end of file
+    QUIZ_QUESTIONS = json.load(f)
+
+QUIZ_BANK = QuestionBank(QUIZ_QUESTIONS, default_points=3)
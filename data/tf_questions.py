@@ -1,6 +1,8 @@
 import json
 from pathlib import Path
 
+from data.question_bank import QuestionBank
+
 _DATA_PATH = Path(__file__).with_name("tf_questions.json")
 
 def load_tf_questions():
@@ -22,4 +24,5 @@ def load_tf_questions():
 
     return data
 
-TF_QUESTIONS = load_tf_questions()
\ No newline at end of file
+TF_QUESTIONS = load_tf_questions()
+TF_BANK = QuestionBank(TF_QUESTIONS, default_points=5)
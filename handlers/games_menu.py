@@ -13,9 +13,10 @@ def games_kb():
     kb = InlineKeyboardBuilder()
     kb.button(text="✅❌ Правда / Ложь", callback_data="tf:start")
     kb.button(text="🧠 Викторина", callback_data="quiz:start")
-    kb.button(text="⚔️ PvP Викторина", callback_data="pvp:invite")
+    kb.button(text="🎲 Найти соперника", callback_data="pvp:find")
+    kb.button(text="⚔️ PvP по ссылке", callback_data="pvp:invite")
     kb.button(text="🏠 Главное меню", callback_data="menu:home")
-    kb.adjust(2,1,1)
+    kb.adjust(2,2,1)
     return kb.as_markup()
 
 
@@ -1,31 +1,44 @@
+from typing import Optional
+
 from aiogram import Router, F
 from aiogram.filters import Command
 from aiogram.types import Message, CallbackQuery
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 
-from services.scoring import upsert_user, get_daily_leaderboard, get_leaderboard, get_user_display
+from services.scoring import upsert_user, get_daily_leaderboard, get_leaderboard, get_user_displays, get_rank, rank_line
 
 router = Router()
 
 
-def render_daily() -> str:
+def _with_rank(lines: list[str], viewer_id: Optional[int], scope: str) -> str:
+    # «ты на N-м месте из M» — берётся из индекса, без сортировки всех игроков
+    if viewer_id is not None:
+        line = rank_line(get_rank(viewer_id, scope))
+        if line:
+            lines.append(f"\n{line}")
+    return "\n".join(lines)
+
+
+def render_daily(viewer_id: Optional[int] = None) -> str:
     items, day = get_daily_leaderboard(limit=10)
     if not items:
         return f"🏆 Лидерборд за {day}\n\nПока пусто 🙂"
     lines = [f"🏆 Лидерборд за {day}\n"]
+    names = get_user_displays([uid for uid, _ in items])
     for i, (uid, pts) in enumerate(items, 1):
-        lines.append(f"{i}. {get_user_display(uid)} — {pts}")
-    return "\n".join(lines)
+        lines.append(f"{i}. {names[uid]} — {pts}")
+    return _with_rank(lines, viewer_id, "daily")
 
 
-def render_total() -> str:
+def render_total(viewer_id: Optional[int] = None) -> str:
     items = get_leaderboard(limit=10)
     if not items:
         return "🏆 Лидерборд (всего)\n\nПока пусто 🙂"
     lines = ["🏆 Лидерборд (всего)\n"]
+    names = get_user_displays([uid for uid, _ in items])
     for i, (uid, pts) in enumerate(items, 1):
-        lines.append(f"{i}. {get_user_display(uid)} — {pts}")
-    return "\n".join(lines)
+        lines.append(f"{i}. {names[uid]} — {pts}")
+    return _with_rank(lines, viewer_id, "total")
 
 
 def leaderboard_kb(active: str = "daily"):
@@ -50,7 +63,7 @@ def leaderboard_kb(active: str = "daily"):
 async def leaderboard_cb(cb: CallbackQuery):
     upsert_user(cb.from_user.id, cb.from_user.full_name, cb.from_user.username)
 
-    text = render_daily()
+    text = render_daily(cb.from_user.id)
     kb = leaderboard_kb(active="daily")
 
     if cb.message and cb.message.text:
@@ -67,18 +80,18 @@ async def leaderboard_cb(cb: CallbackQuery):
 
 @router.callback_query(F.data == "lb:daily")
 async def leaderboard_daily(cb: CallbackQuery):
-    text = render_daily()
+    text = render_daily(cb.from_user.id)
     await cb.message.edit_text(text, reply_markup=leaderboard_kb(active="daily"))
     await cb.answer()
 
 
 @router.callback_query(F.data == "lb:total")
 async def leaderboard_total(cb: CallbackQuery):
-    text = render_total()
+    text = render_total(cb.from_user.id)
     await cb.message.edit_text(text, reply_markup=leaderboard_kb(active="total"))
     await cb.answer()
 
 @router.message(Command("leaderboard"))
 async def leaderboard_msg(message: Message):
     upsert_user(message.from_user.id, message.from_user.full_name, message.from_user.username)
-    await message.answer(render_daily(), reply_markup=leaderboard_kb(active="daily"))
\ No newline at end of file
+    await message.answer(render_daily(message.from_user.id), reply_markup=leaderboard_kb(active="daily"))
\ No newline at end of file
@@ -4,8 +4,8 @@ from aiogram.types import Message, CallbackQuery
 from aiogram.fsm.context import FSMContext
 
 from keyboards.main_menu import back_to_menu_kb
-from services.scoring import upsert_user, get_profile, get_user_display
-from services.progress import get_seen_today
+from services.scoring import upsert_user, get_profile, get_user_display, get_rank, rank_line
+from services.progress import count_seen_today
 from services.pvp_stats import get_stats
 
 router = Router()
@@ -21,12 +21,14 @@ def level_title(total_points: int) -> str:
     return "🟣 Юный экономист"
 
 
-def profile_text(name: str, total: int, today: int, seen_tf_today: int, seen_quiz_today: int, pvp: dict) -> str:
+def profile_text(name: str, total: int, today: int, seen_tf_today: int, seen_quiz_today: int, pvp: dict, rank: str = "") -> str:
+    rank_text = f"{rank}\n" if rank else ""
     return (
         f"👤 Профиль\n\n"
         f"Игрок: {name}\n"
         f"🎓 Уровень: {level_title(total)}\n\n"
         f"⭐ Очки всего: {total}\n"
+        f"{rank_text}"
         f"📅 Очки сегодня: {today}\n\n"
         f"📊 Статистика (сегодня):\n"
         f"— TF «Правда/Ложь» решено: {seen_tf_today}\n"
@@ -49,10 +51,11 @@ async def profile_msg(message: Message, state: FSMContext):
     total, today = get_profile(uid)
     name = get_user_display(uid)
 
-    seen_tf_today = len(get_seen_today(uid, "tf"))
-    seen_quiz_today = len(get_seen_today(uid, "quiz"))
+    seen_tf_today = count_seen_today(uid, "tf")
+    seen_quiz_today = count_seen_today(uid, "quiz")
     pvp = get_stats(uid)
-    text = profile_text(name, total, today, seen_tf_today, seen_quiz_today, pvp)
+    rank = rank_line(get_rank(uid, "total"))
+    text = profile_text(name, total, today, seen_tf_today, seen_quiz_today, pvp, rank)
 
     photos = await message.bot.get_user_profile_photos(uid, limit=1)
     if photos.total_count > 0:
@@ -72,10 +75,11 @@ async def profile_cb(cb: CallbackQuery, state: FSMContext):
     uid = cb.from_user.id
     total, today = get_profile(uid)
     name = get_user_display(uid)
-    seen_tf_today = len(get_seen_today(uid, "tf"))
-    seen_quiz_today = len(get_seen_today(uid, "quiz"))
+    seen_tf_today = count_seen_today(uid, "tf")
+    seen_quiz_today = count_seen_today(uid, "quiz")
     pvp = get_stats(uid)
-    text = profile_text(name, total, today, seen_tf_today, seen_quiz_today, pvp)
+    rank = rank_line(get_rank(uid, "total"))
+    text = profile_text(name, total, today, seen_tf_today, seen_quiz_today, pvp, rank)
     photos = await cb.bot.get_user_profile_photos(uid, limit=1)
 
     # Если у пользователя есть аватар — показываем фото + caption (нельзя edit_text на медиа)
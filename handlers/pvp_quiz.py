@@ -1,33 +1,37 @@
 import time
 import uuid
-import random
 import asyncio
 from math import ceil
 from typing import Dict, Any, Optional
 
-from aiogram import Router, F
-from aiogram.types import CallbackQuery
+from aiogram import Bot, Router, F
+from aiogram.types import CallbackQuery, InlineKeyboardButton, InlineKeyboardMarkup
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 
-from data.quiz_questions import QUIZ_QUESTIONS
-from services.scoring import add_points, upsert_user
+from data.quiz_questions import QUIZ_BANK
+from services.matchmaking import MatchmakingQueue
+from services.scoring import award_points, get_profile, upsert_user
 from services.points_text_tfgame import points_text
-from services.pvp_storage import get_match, upsert_match, delete_match, cleanup_expired
+from services.deadlines import DeadlineScheduler
+from services.fanout import fan_out
+from services.pvp_storage import get_match, get_registry, match_lock, upsert_match, delete_match
 from services.pvp_stats import add_win, add_loss, add_draw, ensure_user
 
 router = Router()
 
 ROUNDS_PER_MATCH = 5
 ROUND_TIMEOUT_SEC = 60  # можешь поменять
-MATCH_TTL_SEC = 60 * 60  # авто-очистка старых матчей
+MATCHMAKING_TIMEOUT_SEC = 30  # сколько ищем соперника, потом предлагаем ссылку
 
 DIFFICULTY_EMOJI = {1: "🟢", 2: "🔵", 3: "🟡", 4: "🟠", 5: "🔴"}
 LETTER = {0: "A", 1: "B", 2: "C", 3: "D"}
 
 
+_BADGES = {pts: f"{emoji} Сложность: {pts}/5" for pts, emoji in DIFFICULTY_EMOJI.items()}
+
+
 def difficulty_badge(pts: int) -> str:
-    pts = max(1, min(5, int(pts)))
-    return f"{DIFFICULTY_EMOJI[pts]} Сложность: {pts}/5"
+    return _BADGES[max(1, min(5, int(pts)))]
 
 
 def invite_kb(match_id: str):
@@ -39,19 +43,43 @@ def invite_kb(match_id: str):
     return kb.as_markup()
 
 
-def answer_kb(match_id: str, qid: int):
+def searching_kb():
+    kb = InlineKeyboardBuilder()
+    kb.button(text="❌ Отменить поиск", callback_data="pvp:find:cancel")
+    kb.adjust(1)
+    return kb.as_markup()
+
+
+def not_found_kb():
     kb = InlineKeyboardBuilder()
-    kb.button(text="A", callback_data=f"pvp:ans:{match_id}:{qid}:0")
-    kb.button(text="B", callback_data=f"pvp:ans:{match_id}:{qid}:1")
-    kb.button(text="C", callback_data=f"pvp:ans:{match_id}:{qid}:2")
-    kb.button(text="D", callback_data=f"pvp:ans:{match_id}:{qid}:3")
-    kb.button(text="⛔ Стоп", callback_data=f"pvp:stop:{match_id}")
+    kb.button(text="🔎 Искать ещё", callback_data="pvp:find")
+    kb.button(text="🔗 Позвать друга по ссылке", callback_data="pvp:invite")
     kb.button(text="🎮 Игры", callback_data="menu:games")
-    kb.button(text="🏠 Главное меню", callback_data="menu:home")
-    kb.adjust(4, 1, 1, 1)
+    kb.adjust(1)
     return kb.as_markup()
 
 
+def _answer_rows(qid: int) -> list[list[tuple[str, str]]]:
+    """
+    Раскладка клавиатуры ответа: (текст, callback_data), где {match_id}
+    подставляется на каждый матч — остальное общее для всех матчей.
+    """
+    return [
+        [(LETTER[i], f"pvp:ans:{{match_id}}:{qid}:{i}") for i in range(4)],
+        [("⛔ Стоп", "pvp:stop:{match_id}")],
+        [("🎮 Игры", "menu:games")],
+        [("🏠 Главное меню", "menu:home")],
+    ]
+
+
+def answer_kb(match_id: str, qid: int):
+    rows = _ANSWER_ROWS.get(qid) or _answer_rows(qid)
+    return InlineKeyboardMarkup(inline_keyboard=[
+        [InlineKeyboardButton(text=text, callback_data=data.format(match_id=match_id)) for text, data in row]
+        for row in rows
+    ])
+
+
 def stop_kb():
     kb = InlineKeyboardBuilder()
     kb.button(text="🎮 Игры", callback_data="menu:games")
@@ -60,7 +88,7 @@ def stop_kb():
     return kb.as_markup()
 
 
-def render_question(q: Dict[str, Any], round_no: int, total_rounds: int) -> str:
+def _render_body(q: Dict[str, Any]) -> str:
     pts = int(q.get("points", 3))
     badge = difficulty_badge(pts)
 
@@ -70,7 +98,6 @@ def render_question(q: Dict[str, Any], round_no: int, total_rounds: int) -> str:
     )
 
     return (
-        f"⚔️ PvP Викторина — раунд {round_no}/{total_rounds}\n\n"
         f"{badge}\n\n"
         f"⏳ Время на ответ: 1 минута\n\n"
         f"❓ {q['text']}\n\n"
@@ -79,17 +106,38 @@ def render_question(q: Dict[str, Any], round_no: int, total_rounds: int) -> str:
     )
 
 
+# тело вопроса и раскладка кнопок не зависят от матча — готовим их при загрузке банка
+_BODIES = {int(q["id"]): _render_body(q) for q in QUIZ_BANK}
+_ANSWER_ROWS = {qid: _answer_rows(qid) for qid in _BODIES}
+
+
+def render_question(q: Dict[str, Any], round_no: int, total_rounds: int) -> str:
+    body = _BODIES.get(int(q["id"])) or _render_body(q)
+    return f"⚔️ PvP Викторина — раунд {round_no}/{total_rounds}\n\n{body}"
+
+
 def _now() -> int:
     return int(time.time())
 
 
-def _pick_questions(n: int) -> list[Dict[str, Any]]:
+def _pick_questions(n: int, difficulty: Optional[int] = None) -> list[Dict[str, Any]]:
     # безопасно: если вопросов меньше, чем n — берём сколько есть
-    n = min(n, len(QUIZ_QUESTIONS))
-    return random.sample(QUIZ_QUESTIONS, k=n)
+    return QUIZ_BANK.sample(n, difficulty=difficulty)
 
 
-async def _send_round(cb: CallbackQuery, match: Dict[str, Any]) -> None:
+async def _notify_players(bot: Bot, match: Dict[str, Any], text: str, reply_markup=None) -> None:
+    """
+    Одно и то же сообщение всем игрокам матча, параллельно.
+    """
+    async def send_to(uid: int) -> None:
+        chat_id = match["chats"].get(str(uid))
+        if chat_id:
+            await bot.send_message(chat_id=chat_id, text=text, reply_markup=reply_markup)
+
+    await fan_out(match["players"], send_to)
+
+
+async def _send_round(bot: Bot, match: Dict[str, Any]) -> None:
     """
     Отправляет текущий раунд обоим игрокам (новым сообщением).
     """
@@ -101,40 +149,99 @@ async def _send_round(cb: CallbackQuery, match: Dict[str, Any]) -> None:
     match["current_qid"] = qid
     match["answers"] = {str(players[0]): None, str(players[1]): None}
     match["round_started_at"] = _now()
+    match["round_deadline"] = match["round_started_at"] + ROUND_TIMEOUT_SEC
     match["updated_at"] = _now()
 
-    # Отправляем каждому игроку в его чат
-    for uid in players:
+    # текст и клавиатура у обоих игроков одинаковые
+    text = render_question(q, round_index + 1, ROUNDS_PER_MATCH)
+    kb = answer_kb(match["id"], qid)
+
+    # Отправляем каждому игроку в его чат — обоим сразу, а не по очереди
+    async def send_to(uid: int) -> None:
         chat_id = match["chats"].get(str(uid))
         if not chat_id:
-            continue
-        msg = await cb.bot.send_message(
+            return
+        msg = await bot.send_message(
             chat_id=chat_id,
-            text=render_question(q, round_index + 1, ROUNDS_PER_MATCH),
-            reply_markup=answer_kb(match["id"], qid),
+            text=text,
+            reply_markup=kb,
         )
         match["round_messages"][str(uid)] = {"chat_id": chat_id, "message_id": msg.message_id}
 
+    await fan_out(players, send_to)
+
+    # дедлайн сохранён вместе с матчем — после рестарта таймер поднимется заново
     await upsert_match(match["id"], match)
+    _round_timers().schedule(match["id"], match["round_deadline"])
 
-    # Таймер раунда (не переживает перезапуск — это ок для простой версии)
-    asyncio.create_task(_round_timeout_task(cb, match["id"], match["round_started_at"]))
 
+# Таймеры раундов всех матчей и поиска соперника — одна задача (см. start_round_timers).
+# Ключ — id матча или "find:<user_id>" для поиска.
+_timers: Optional[DeadlineScheduler] = None
+_SEARCH_PREFIX = "find:"
 
-async def _round_timeout_task(cb: CallbackQuery, match_id: str, started_at: int) -> None:
-    await asyncio.sleep(ROUND_TIMEOUT_SEC)
+# кто сейчас ищет соперника (только в памяти: после рестарта поиск просто начинают заново)
+_matchmaking = MatchmakingQueue()
 
-    match = await get_match(match_id)
-    if not match:
-        return
+# username бота для ссылок-приглашений — один get_me() при старте
+_bot_username: Optional[str] = None
+
+
+def _round_timers() -> DeadlineScheduler:
+    if _timers is None:
+        raise RuntimeError("Таймеры PvP-раундов не запущены: вызови start_round_timers(bot)")
+    return _timers
 
-    # если раунд уже другой или матч не активен — ничего
-    if match.get("status") != "active":
-        return
-    if int(match.get("round_started_at", 0)) != int(started_at):
-        return
 
-    await _finalize_round(cb, match_id, reason="timeout")
+async def load_bot_username(bot: Bot) -> str:
+    global _bot_username
+    if _bot_username is None:
+        _bot_username = (await bot.get_me()).username
+    return _bot_username
+
+
+def configure_matchmaking(band: Optional[int]) -> None:
+    """
+    Ширина полосы очков для поиска соперника (0 — без полос). Вызывается при старте, до polling.
+    """
+    global _matchmaking
+    _matchmaking = MatchmakingQueue(band=band)
+
+
+def start_round_timers(bot: Bot) -> DeadlineScheduler:
+    """
+    Запускает планировщик дедлайнов раундов и заново ставит дедлайны
+    активных матчей, поднятых из снимка после рестарта.
+    """
+    global _timers
+
+    async def on_deadline(key: str) -> None:
+        if key.startswith(_SEARCH_PREFIX):
+            await _search_timeout(bot, int(key[len(_SEARCH_PREFIX):]))
+        else:
+            await _round_timeout(bot, key)
+
+    _timers = DeadlineScheduler(on_deadline)
+    for match_id, match in get_registry().items():
+        if match.get("status") == "active" and match.get("round_deadline"):
+            _timers.schedule(match_id, float(match["round_deadline"]))
+    _timers.start()
+    return _timers
+
+
+async def _round_timeout(bot: Bot, match_id: str) -> None:
+    async with match_lock(match_id):
+        match = await get_match(match_id)
+        if not match:
+            return
+
+        # если раунд уже закрыт (дедлайн перенесён на следующий) или матч не активен — ничего
+        if match.get("status") != "active":
+            return
+        if int(match.get("round_deadline") or 0) > _now():
+            return
+
+        await _finalize_round(bot, match, reason="timeout")
 
 
 def _calc_delta(is_correct: bool, pts: int) -> int:
@@ -147,11 +254,13 @@ def _get_opponent(players: list[int], uid: int) -> int:
     return players[1] if players[0] == uid else players[0]
 
 
-async def _finalize_round(cb: CallbackQuery, match_id: str, reason: str = "both_answered") -> None:
-    match = await get_match(match_id)
-    if not match or match.get("status") != "active":
-        return
-
+async def _finalize_round(bot: Bot, match: Dict[str, Any], reason: str = "both_answered") -> None:
+    """
+    Закрывает текущий раунд: очки, итоги игрокам, следующий раунд или конец матча.
+    Вызывается только под match_lock, после проверки, что раунд ещё открыт, —
+    поэтому раунд закрывается ровно один раз (таймаут или второй ответ, кто первый).
+    """
+    match_id = match["id"]
     players = match["players"]
     qid = int(match.get("current_qid", 0))
     round_index = int(match["round_index"])
@@ -176,8 +285,10 @@ async def _finalize_round(cb: CallbackQuery, match_id: str, reason: str = "both_
     v2 = verdict_for(players[1], a2)
 
     # начисляем в общий профиль + в матчевый счёт
-    add_points(players[0], v1["delta"])
-    add_points(players[1], v2["delta"])
+    await asyncio.gather(
+        award_points(players[0], v1["delta"], source="pvp"),
+        award_points(players[1], v2["delta"], source="pvp"),
+    )
 
     match["scores"][str(players[0])] += v1["delta"]
     match["scores"][str(players[1])] += v2["delta"]
@@ -189,8 +300,8 @@ async def _finalize_round(cb: CallbackQuery, match_id: str, reason: str = "both_
 
     badge = difficulty_badge(pts)
 
-    # Пишем каждому персональный итог раунда
-    for uid in players:
+    # Пишем каждому персональный итог раунда (обоим параллельно)
+    async def send_result(uid: int) -> None:
         me = v1 if uid == players[0] else v2
         opp_uid = _get_opponent(players, uid)
         opp = v2 if uid == players[0] else v1
@@ -226,7 +337,7 @@ async def _finalize_round(cb: CallbackQuery, match_id: str, reason: str = "both_
         msg_info = match["round_messages"].get(str(uid))
         if msg_info:
             try:
-                await cb.bot.edit_message_text(
+                await bot.edit_message_text(
                     chat_id=msg_info["chat_id"],
                     message_id=msg_info["message_id"],
                     text=text,
@@ -234,10 +345,9 @@ async def _finalize_round(cb: CallbackQuery, match_id: str, reason: str = "both_
                 )
             except Exception:
                 # если не получилось отредактировать — отправим новым сообщением
-                try:
-                    await cb.bot.send_message(chat_id=msg_info["chat_id"], text=text)
-                except Exception:
-                    pass
+                await bot.send_message(chat_id=msg_info["chat_id"], text=text)
+
+    await fan_out(players, send_result)
 
     # следующий раунд или конец
     match["round_index"] = round_index + 1
@@ -264,7 +374,7 @@ async def _finalize_round(cb: CallbackQuery, match_id: str, reason: str = "both_
             add_draw(p2)
 
         # отдельно каждому покажем итог
-        for uid in players:
+        async def send_summary(uid: int) -> None:
             opp_uid = _get_opponent(players, uid)
             my_score = match["scores"][str(uid)]
             opp_score = match["scores"][str(opp_uid)]
@@ -287,36 +397,26 @@ async def _finalize_round(cb: CallbackQuery, match_id: str, reason: str = "both_
 
             chat_id = match["chats"].get(str(uid))
             if chat_id:
-                try:
-                    await cb.bot.send_message(chat_id=chat_id, text=summary, reply_markup=stop_kb())
-                except Exception:
-                    pass
+                await bot.send_message(chat_id=chat_id, text=summary, reply_markup=stop_kb())
 
+        await fan_out(players, send_summary)
         await delete_match(match_id)
         return
 
     # продолжаем матч: шлём следующий раунд
     await upsert_match(match_id, match)
-    await _send_round(cb, match)
-
+    await _send_round(bot, match)
 
-@router.callback_query(F.data == "pvp:invite")
-async def pvp_invite(cb: CallbackQuery):
-    await cleanup_expired(MATCH_TTL_SEC)
 
-    upsert_user(cb.from_user.id, cb.from_user.full_name, cb.from_user.username)
-
-    match_id = uuid.uuid4().hex[:10]
-    host_uid = cb.from_user.id
-
-    match = {
-        "id": match_id,
+def _new_match(host_uid: int, host_chat_id: int) -> Dict[str, Any]:
+    return {
+        "id": uuid.uuid4().hex[:10],
         "status": "waiting",
         "created_at": _now(),
         "updated_at": _now(),
         "host_uid": host_uid,
         "players": [host_uid],
-        "chats": {str(host_uid): cb.message.chat.id if cb.message else host_uid},
+        "chats": {str(host_uid): host_chat_id},
         "questions": [],
         "round_index": 0,
         "current_qid": None,
@@ -326,11 +426,118 @@ async def pvp_invite(cb: CallbackQuery):
         "round_messages": {},
     }
 
+
+def _leave_search(user_id: int) -> None:
+    if _matchmaking.leave(user_id) is not None:
+        _round_timers().cancel(f"{_SEARCH_PREFIX}{user_id}")
+
+
+async def _start_match(bot: Bot, match: Dict[str, Any], guest_uid: int, guest_chat_id: int, greeting: str) -> None:
+    """
+    Гость занял место — матч становится активным и стартует первый раунд.
+    Вызывается под match_lock.
+    """
+    host_uid = int(match["host_uid"])
+
+    # кто ещё стоял в общем поиске (например, принял ссылку во время поиска) — выходит из него,
+    # иначе его сведут во второй матч параллельно этому
+    _leave_search(host_uid)
+    _leave_search(guest_uid)
+
+    # регистрируем гостя
+    match["players"] = [host_uid, guest_uid]
+    match["chats"][str(guest_uid)] = guest_chat_id
+    match["status"] = "active"
+    match["updated_at"] = _now()
+
+    # вопросы на матч
+    match["questions"] = _pick_questions(ROUNDS_PER_MATCH)
+    match["round_index"] = 0
+
+    # счёт
+    match["scores"] = {str(host_uid): 0, str(guest_uid): 0}
+    match["round_messages"] = {}
+
+    await upsert_match(match["id"], match)
+
+    # обоим сообщаем, что матч начался
+    await _notify_players(bot, match, greeting)
+
+    # стартуем 1 раунд
+    await _send_round(bot, match)
+
+
+@router.callback_query(F.data == "pvp:find")
+async def pvp_find(cb: CallbackQuery):
+    upsert_user(cb.from_user.id, cb.from_user.full_name, cb.from_user.username)
+
+    uid = cb.from_user.id
+    chat_id = cb.message.chat.id if cb.message else uid
+    message_id = cb.message.message_id if cb.message else None
+    total, _today = get_profile(uid)
+
+    # без await между поиском и постановкой в очередь: пара не может достаться двоим
+    found = _matchmaking.join(uid, total, (chat_id, message_id))
+    if found is None:
+        _round_timers().schedule(f"{_SEARCH_PREFIX}{uid}", time.time() + MATCHMAKING_TIMEOUT_SEC)
+        await cb.message.edit_text(
+            "🔎 Ищем соперника…\n\nКак только кто-то ещё нажмёт «Найти соперника», дуэль начнётся.",
+            reply_markup=searching_kb(),
+        )
+        await cb.answer()
+        return
+
+    opponent_uid, (opponent_chat_id, _opponent_message_id) = found
+    _round_timers().cancel(f"{_SEARCH_PREFIX}{opponent_uid}")
+
+    # хозяин матча — тот, кто ждал дольше
+    match = _new_match(opponent_uid, opponent_chat_id)
+    await cb.answer("Соперник найден ✅")
+    async with match_lock(match["id"]):
+        await _start_match(cb.bot, match, uid, chat_id, "⚔️ Соперник найден! Начинаем 🔥")
+
+
+@router.callback_query(F.data == "pvp:find:cancel")
+async def pvp_find_cancel(cb: CallbackQuery):
+    if cb.from_user.id not in _matchmaking:
+        await cb.answer("Поиск уже завершён 🙂", show_alert=True)
+        return
+    _leave_search(cb.from_user.id)
+    await cb.message.edit_text("Ок, поиск отменён ✅\n\nКуда дальше?", reply_markup=stop_kb())
+    await cb.answer()
+
+
+async def _search_timeout(bot: Bot, user_id: int) -> None:
+    seat = _matchmaking.leave(user_id)
+    if seat is None:
+        # уже нашёл пару или отменил поиск
+        return
+    chat_id, message_id = seat
+    text = "😕 Пока никто не ищет соперника.\n\nМожно поискать ещё или позвать друга по ссылке."
+    if message_id is not None:
+        try:
+            await bot.edit_message_text(chat_id=chat_id, message_id=message_id, text=text, reply_markup=not_found_kb())
+            return
+        except Exception:
+            pass
+    await bot.send_message(chat_id=chat_id, text=text, reply_markup=not_found_kb())
+
+
+@router.callback_query(F.data == "pvp:invite")
+async def pvp_invite(cb: CallbackQuery):
+    upsert_user(cb.from_user.id, cb.from_user.full_name, cb.from_user.username)
+
+    host_uid = cb.from_user.id
+    # позвал друга по ссылке — из общего поиска выходит
+    _leave_search(host_uid)
+
+    match = _new_match(host_uid, cb.message.chat.id if cb.message else host_uid)
+    match_id = match["id"]
+
     await upsert_match(match_id, match)
 
-    me = await cb.bot.get_me()
     payload = f"pvp_{match_id}"
-    link = f"https://t.me/{me.username}?start={payload}"
+    link = f"https://t.me/{await load_bot_username(cb.bot)}?start={payload}"
 
     text = (
         "⚔️ PvP Викторина\n\n"
@@ -347,150 +554,118 @@ async def pvp_invite(cb: CallbackQuery):
 @router.callback_query(F.data.startswith("pvp:cancel:"))
 async def pvp_cancel(cb: CallbackQuery):
     match_id = cb.data.split(":")[2]
-    match = await get_match(match_id)
-    if not match:
-        await cb.answer("Этот вызов уже неактуален 🙂", show_alert=True)
-        return
+    async with match_lock(match_id):
+        match = await get_match(match_id)
+        if not match:
+            await cb.answer("Этот вызов уже неактуален 🙂", show_alert=True)
+            return
 
-    if match.get("status") != "waiting":
-        await cb.answer("Матч уже начался — отменить нельзя.", show_alert=True)
-        return
+        if match.get("status") != "waiting":
+            await cb.answer("Матч уже начался — отменить нельзя.", show_alert=True)
+            return
 
-    if int(match.get("host_uid")) != cb.from_user.id:
-        await cb.answer("Отменить может только создатель дуэли.", show_alert=True)
-        return
+        if int(match.get("host_uid")) != cb.from_user.id:
+            await cb.answer("Отменить может только создатель дуэли.", show_alert=True)
+            return
 
-    await delete_match(match_id)
-    await cb.message.edit_text("Ок, дуэль отменена ✅\n\nКуда дальше?", reply_markup=stop_kb())
-    await cb.answer()
+        await delete_match(match_id)
+        await cb.message.edit_text("Ок, дуэль отменена ✅\n\nКуда дальше?", reply_markup=stop_kb())
+        await cb.answer()
 
 
 @router.callback_query(F.data.startswith("pvp:accept:"))
 async def pvp_accept(cb: CallbackQuery):
-    await cleanup_expired(MATCH_TTL_SEC)
-
     match_id = cb.data.split(":")[2]
-    match = await get_match(match_id)
-    if not match:
-        await cb.answer("Этот вызов уже неактуален 🙂", show_alert=True)
-        return
-
-    if match.get("status") != "waiting":
-        await cb.answer("Этот матч уже начался 🙂", show_alert=True)
-        return
-
-    host_uid = int(match["host_uid"])
-    guest_uid = cb.from_user.id
-
-    if guest_uid == host_uid:
-        await cb.answer("Нельзя принять дуэль самому себе 🙂", show_alert=True)
-        return
-
-    upsert_user(cb.from_user.id, cb.from_user.full_name, cb.from_user.username)
-
-    # регистрируем гостя
-    match["players"] = [host_uid, guest_uid]
-    match["chats"][str(guest_uid)] = cb.message.chat.id if cb.message else guest_uid
-    match["status"] = "active"
-    match["updated_at"] = _now()
+    async with match_lock(match_id):
+        match = await get_match(match_id)
+        if not match:
+            await cb.answer("Этот вызов уже неактуален 🙂", show_alert=True)
+            return
 
-    # вопросы на матч
-    match["questions"] = _pick_questions(ROUNDS_PER_MATCH)
-    match["round_index"] = 0
+        if match.get("status") != "waiting":
+            await cb.answer("Этот матч уже начался 🙂", show_alert=True)
+            return
 
-    # счёт
-    match["scores"] = {str(host_uid): 0, str(guest_uid): 0}
-    match["round_messages"] = {}
+        host_uid = int(match["host_uid"])
+        guest_uid = cb.from_user.id
 
-    await upsert_match(match_id, match)
+        if guest_uid == host_uid:
+            await cb.answer("Нельзя принять дуэль самому себе 🙂", show_alert=True)
+            return
 
-    # обоим сообщаем, что матч начался
-    for uid in match["players"]:
-        chat_id = match["chats"].get(str(uid))
-        if chat_id:
-            try:
-                await cb.bot.send_message(chat_id=chat_id, text="⚔️ Дуэль принята! Начинаем 🔥")
-            except Exception:
-                pass
+        upsert_user(cb.from_user.id, cb.from_user.full_name, cb.from_user.username)
 
-    # стартуем 1 раунд
-    await _send_round(cb, match)
-    await cb.answer("Матч начался ✅", show_alert=True)
+        guest_chat_id = cb.message.chat.id if cb.message else guest_uid
+        await _start_match(cb.bot, match, guest_uid, guest_chat_id, "⚔️ Дуэль принята! Начинаем 🔥")
+        await cb.answer("Матч начался ✅", show_alert=True)
 
 
 @router.callback_query(F.data.startswith("pvp:stop:"))
 async def pvp_stop(cb: CallbackQuery):
     match_id = cb.data.split(":")[2]
-    match = await get_match(match_id)
-    if not match:
-        await cb.answer("Матч уже неактуален 🙂", show_alert=True)
-        return
+    async with match_lock(match_id):
+        match = await get_match(match_id)
+        if not match:
+            await cb.answer("Матч уже неактуален 🙂", show_alert=True)
+            return
 
-    if cb.from_user.id not in match.get("players", []):
-        await cb.answer("Ты не участник этого матча.", show_alert=True)
-        return
+        if cb.from_user.id not in match.get("players", []):
+            await cb.answer("Ты не участник этого матча.", show_alert=True)
+            return
 
-    # Завершаем матч “по инициативе”
-    players = match["players"]
-    for uid in players:
-        chat_id = match["chats"].get(str(uid))
-        if chat_id:
-            try:
-                await cb.bot.send_message(
-                    chat_id=chat_id,
-                    text="⛔ Матч остановлен.\n\nКуда дальше?",
-                    reply_markup=stop_kb(),
-                )
-            except Exception:
-                pass
+        # Завершаем матч “по инициативе”
+        await _notify_players(cb.bot, match, "⛔ Матч остановлен.\n\nКуда дальше?", reply_markup=stop_kb())
 
-    await delete_match(match_id)
-    await cb.answer()
+        _round_timers().cancel(match_id)
+        await delete_match(match_id)
+        await cb.answer()
 
 
 @router.callback_query(F.data.startswith("pvp:ans:"))
 async def pvp_answer(cb: CallbackQuery):
-    await cleanup_expired(MATCH_TTL_SEC)
-
     parts = cb.data.split(":")
     # pvp:ans:<match_id>:<qid>:<opt>
     match_id = parts[2]
     qid = int(parts[3])
     opt = int(parts[4])
 
-    match = await get_match(match_id)
-    if not match or match.get("status") != "active":
-        await cb.answer("Этот матч уже неактуален 🙂", show_alert=True)
-        return
-
-    uid = cb.from_user.id
-    if uid not in match.get("players", []):
-        await cb.answer("Ты не участник этого матча.", show_alert=True)
-        return
-
-    # проверка актуальности вопроса
-    if int(match.get("current_qid", 0)) != qid:
-        await cb.answer("Этот вопрос уже неактуален 🙂", show_alert=True)
-        return
-
-    # если уже ответил — не даём накликать
-    if match["answers"].get(str(uid)) is not None:
-        await cb.answer("Ты уже ответил 🙂", show_alert=True)
-        return
-
-    match["answers"][str(uid)] = opt
-    match["updated_at"] = _now()
-    await upsert_match(match_id, match)
-
-    # если второй ещё не ответил — просто подтверждаем
-    players = match["players"]
-    other_uid = players[1] if players[0] == uid else players[0]
-    other_ans = match["answers"].get(str(other_uid))
-
-    if other_ans is None:
-        await cb.answer("Ответ принят ✅")
-        return
-
-    # оба ответили -> завершаем раунд
-    await cb.answer()
-    await _finalize_round(cb, match_id, reason="both_answered")
+    # проверка, запись ответа и закрытие раунда — одним куском под локом матча
+    async with match_lock(match_id):
+        match = await get_match(match_id)
+        if not match or match.get("status") != "active":
+            await cb.answer("Этот матч уже неактуален 🙂", show_alert=True)
+            return
+
+        uid = cb.from_user.id
+        if uid not in match.get("players", []):
+            await cb.answer("Ты не участник этого матча.", show_alert=True)
+            return
+
+        # проверка актуальности вопроса
+        if int(match.get("current_qid", 0)) != qid:
+            await cb.answer("Этот вопрос уже неактуален 🙂", show_alert=True)
+            return
+
+        # если уже ответил — не даём накликать
+        if match["answers"].get(str(uid)) is not None:
+            await cb.answer("Ты уже ответил 🙂", show_alert=True)
+            return
+
+        match["answers"][str(uid)] = opt
+        match["updated_at"] = _now()
+        await upsert_match(match_id, match)
+
+        # если второй ещё не ответил — просто подтверждаем
+        players = match["players"]
+        other_uid = players[1] if players[0] == uid else players[0]
+        other_ans = match["answers"].get(str(other_uid))
+
+        if other_ans is None:
+            await cb.answer("Ответ принят ✅")
+            return
+
+        # оба ответили -> таймер раунда больше не нужен, завершаем раунд
+        # (всё ещё под локом матча: таймаут, если уже сработал, увидит закрытый раунд)
+        _round_timers().cancel(match_id)
+        await cb.answer()
+        await _finalize_round(cb.bot, match, reason="both_answered")
@@ -1,17 +1,17 @@
-import random
-from math import ceil
+import logging
 
 from aiogram import Router, F
 from aiogram.types import CallbackQuery
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 
-from data.quiz_questions import QUIZ_QUESTIONS
-from services.scoring import add_points, upsert_user
-from services.progress import get_seen_today, mark_seen_today
+from data.quiz_questions import QUIZ_BANK
+from services.answers import next_question, record_answer
+from services.scoring import upsert_user
 from services.points_text_tfgame import points_text
-from services.streaks import update_streak, streak_line
+from services.streaks import streak_line
 
 router = Router()
+log = logging.getLogger(__name__)
 
 active_question = {}  # user_id -> question_dict
 
@@ -26,17 +26,15 @@ DIFFICULTY_EMOJI = {
 LETTER = {0: "A", 1: "B", 2: "C", 3: "D"}
 
 
+_BADGES = {pts: f"{emoji} Сложность: {pts}/5" for pts, emoji in DIFFICULTY_EMOJI.items()}
+
+
 def difficulty_badge(pts: int) -> str:
-    pts = max(1, min(5, int(pts)))
-    return f"{DIFFICULTY_EMOJI[pts]} Сложность: {pts}/5"
+    return _BADGES[max(1, min(5, int(pts)))]
 
 
 def pick_unseen_question(user_id: int):
-    seen = get_seen_today(user_id, "quiz")
-    unseen = [q for q in QUIZ_QUESTIONS if q["id"] not in seen]
-    if not unseen:
-        return None
-    return random.choice(unseen)
+    return next_question(user_id, "quiz")
 
 
 def quiz_kb(qid: int):
@@ -74,6 +72,20 @@ def render_question(q: dict) -> str:
     return f"🧠 Викторина\n\n{badge}\n\n❓ {q['text']}\n\n{options_text}\n\nВыбери A/B/C/D кнопками ниже:"
 
 
+# тексты и клавиатуры вопросов не меняются — собираем один раз при загрузке банка
+_RENDERED = {int(q["id"]): (render_question(q), quiz_kb(int(q["id"]))) for q in QUIZ_BANK}
+
+
+def rendered_question(q: dict):
+    """
+    (текст, клавиатура) для вопроса; новые вопросы (не из банка) собираются на лету.
+    """
+    cached = _RENDERED.get(int(q["id"]))
+    if cached is None:
+        cached = (render_question(q), quiz_kb(int(q["id"])))
+    return cached
+
+
 @router.callback_query(F.data == "quiz:stop")
 async def quiz_stop(cb: CallbackQuery):
     active_question.pop(cb.from_user.id, None)
@@ -92,7 +104,8 @@ async def quiz_start(cb: CallbackQuery):
         return
 
     active_question[cb.from_user.id] = q
-    await cb.message.edit_text(render_question(q), reply_markup=quiz_kb(q["id"]))
+    text, kb = rendered_question(q)
+    await cb.message.edit_text(text, reply_markup=kb)
     await cb.answer()
 
 
@@ -107,6 +120,8 @@ async def quiz_answer(cb: CallbackQuery):
     if not q or q["id"] != qid:
         await cb.answer("Этот вопрос уже неактуален 🙂", show_alert=True)
         return
+    # забираем вопрос до первого await: второе нажатие уже не пройдёт проверку выше
+    active_question.pop(cb.from_user.id, None)
 
     pts = int(q.get("points", 3))
     badge = difficulty_badge(pts)
@@ -114,34 +129,35 @@ async def quiz_answer(cb: CallbackQuery):
     correct_opt = int(q["answer"])
     is_correct = (user_opt == correct_opt)
 
-    cur_streak, best_streak, bonus = update_streak(cb.from_user.id, "quiz", is_correct)
-    streak_text = streak_line(cur_streak)
+    # серия, очки, бонус и «видел сегодня» — одной транзакцией
+    try:
+        result = await record_answer(cb.from_user.id, "quiz", qid, is_correct, pts)
+    except Exception:
+        # очки или серия могли уже примениться — вопрос обратно не возвращаем,
+        # иначе повторное нажатие засчитает его второй раз
+        log.exception("Failed to record answer")
+        await cb.message.edit_text("😕 Не получилось записать ответ.\n\nПопробуй продолжить чуть позже.", reply_markup=stop_kb())
+        await cb.answer()
+        return
+    streak_text = streak_line(result.streak)
 
     if is_correct:
-        # начисляем очки за вопрос
-        add_points(cb.from_user.id, pts)
-
         # бонус за серию — только при правильном ответе
-        if bonus > 0:
-            add_points(cb.from_user.id, bonus)
-            bonus_text = f" 🎁 Бонус: {points_text(bonus)}"
+        if result.bonus > 0:
+            bonus_text = f" 🎁 Бонус: {points_text(result.bonus)}"
         else:
             bonus_text = ""
 
-        verdict = f"{badge}\n✅ Верно! {points_text(pts)}{bonus_text}"
+        verdict = f"{badge}\n✅ Верно! {points_text(result.delta)}{bonus_text}"
         if streak_text:
             verdict += f"\n\n{streak_text}"
 
     else:
-        # штраф за ошибку
-        penalty = -ceil(pts / 2)
-        add_points(cb.from_user.id, penalty)
-
         correct_letter = LETTER.get(correct_opt, "?")
         correct_text = q["options"][correct_opt] if q.get("options") else ""
 
         verdict = (
-            f"{badge}\n❌ Неверно! {points_text(penalty)}\n\n"
+            f"{badge}\n❌ Неверно! {points_text(result.delta)}\n\n"
             f"✅ Правильный ответ: {correct_letter}. {correct_text}"
         )
 
@@ -149,15 +165,13 @@ async def quiz_answer(cb: CallbackQuery):
     if explain:
         verdict = f"{verdict}\n\n💡 {explain}"
 
-    mark_seen_today(cb.from_user.id, "quiz", qid)
-    active_question.pop(cb.from_user.id, None)
-
-    nxt = pick_unseen_question(cb.from_user.id)
+    nxt = result.next_question
     if not nxt:
         await cb.message.edit_text(f"{verdict}\n\nСегодня вопросы викторины закончились 🎉", reply_markup=stop_kb())
         await cb.answer()
         return
 
     active_question[cb.from_user.id] = nxt
-    await cb.message.edit_text(f"{verdict}\n\n— — —\n\n{render_question(nxt)}", reply_markup=quiz_kb(nxt["id"]))
+    text, kb = rendered_question(nxt)
+    await cb.message.edit_text(f"{verdict}\n\n— — —\n\n{text}", reply_markup=kb)
     await cb.answer()
\ No newline at end of file
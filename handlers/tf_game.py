@@ -1,15 +1,16 @@
-import random
-from math import ceil
+import logging
+
 from aiogram import Router, F
 from aiogram.types import CallbackQuery
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 
-from data.tf_questions import TF_QUESTIONS
-from services.scoring import add_points, upsert_user
-from services.progress import get_seen_today, mark_seen_today
+from data.tf_questions import TF_BANK
+from services.answers import next_question, record_answer
+from services.scoring import upsert_user
 from services.points_text_tfgame import points_text
-from services.streaks import update_streak, streak_line
+from services.streaks import streak_line
 router = Router()
+log = logging.getLogger(__name__)
 
 active_question = {}  # user_id -> question_dict
 
@@ -21,9 +22,11 @@ DIFFICULTY_EMOJI = {
     5: "🔴",
 }
 
+_BADGES = {pts: f"\n {emoji} Сложность: {pts}/5\n" for pts, emoji in DIFFICULTY_EMOJI.items()}
+
+
 def difficulty_badge(pts: int) -> str:
-    pts = max(1, min(5, int(pts)))
-    return f"\n {DIFFICULTY_EMOJI[pts]} Сложность: {pts}/5\n"
+    return _BADGES[max(1, min(5, int(pts)))]
 
 
 def question_kb(qid: int):
@@ -35,6 +38,25 @@ def question_kb(qid: int):
     return kb.as_markup()
 
 
+def render_question(q: dict) -> str:
+    badge = difficulty_badge(int(q.get("points", 5)))
+    return f"{badge}\n\n{q['text']}"
+
+
+# тексты и клавиатуры вопросов не меняются — собираем один раз при загрузке банка
+_RENDERED = {int(q["id"]): (render_question(q), question_kb(int(q["id"]))) for q in TF_BANK}
+
+
+def rendered_question(q: dict):
+    """
+    (текст, клавиатура) для вопроса; новые вопросы (не из банка) собираются на лету.
+    """
+    cached = _RENDERED.get(int(q["id"]))
+    if cached is None:
+        cached = (render_question(q), question_kb(int(q["id"])))
+    return cached
+
+
 def stop_kb():
     kb = InlineKeyboardBuilder()
     kb.button(text="🎮 Игры", callback_data="menu:games")
@@ -44,11 +66,7 @@ def stop_kb():
 
 
 def pick_unseen_question(user_id: int):
-    seen = get_seen_today(user_id, "tf")
-    unseen = [q for q in TF_QUESTIONS if q["id"] not in seen]
-    if not unseen:
-        return None
-    return random.choice(unseen)
+    return next_question(user_id, "tf")
 
 
 @router.callback_query(F.data == "tf:stop")
@@ -69,12 +87,8 @@ async def start_tf(cb: CallbackQuery):
         return
 
     active_question[cb.from_user.id] = q
-    pts = int(q.get("points", 5))
-    badge = difficulty_badge(pts)
-    await cb.message.edit_text(
-    f"✅❌ Правда или ложь?\n\n{badge}\n\n{q['text']}",
-    reply_markup=question_kb(q["id"])
-)
+    text, kb = rendered_question(q)
+    await cb.message.edit_text(f"✅❌ Правда или ложь?\n\n{text}", reply_markup=kb)
     await cb.answer()
 
 
@@ -89,6 +103,8 @@ async def answer_tf(cb: CallbackQuery):
     if not q or q["id"] != qid:
         await cb.answer("Этот вопрос уже неактуален 🙂", show_alert=True)
         return
+    # забираем вопрос до первого await: второе нажатие уже не пройдёт проверку выше
+    active_question.pop(cb.from_user.id, None)
 
     correct = int(q["answer"])
     pts = int(q.get("points", 5))  # сложность вопроса (1–5)
@@ -96,44 +112,39 @@ async def answer_tf(cb: CallbackQuery):
 
     is_correct = (user_answer == correct)
 
-    # 🔥 стрик + бонус (считаем всегда, чтобы при ошибке стрик сбрасывался)
-    cur_streak, best_streak, bonus = update_streak(cb.from_user.id, "tf", is_correct)
-    streak_text = streak_line(cur_streak)
-    bonus_text = f"\n 🎁 Бонус: {points_text(bonus)}" if bonus > 0 else ""
+    # 🔥 стрик + бонус + очки + «видел сегодня» — одной транзакцией
+    # (стрик считаем всегда, чтобы при ошибке он сбрасывался)
+    try:
+        result = await record_answer(cb.from_user.id, "tf", qid, is_correct, pts)
+    except Exception:
+        # очки или серия могли уже примениться — вопрос обратно не возвращаем,
+        # иначе повторное нажатие засчитает его второй раз
+        log.exception("Failed to record answer")
+        await cb.message.edit_text("😕 Не получилось записать ответ.\n\nПопробуй продолжить чуть позже.", reply_markup=stop_kb())
+        await cb.answer()
+        return
+    streak_text = streak_line(result.streak)
+    bonus_text = f"\n 🎁 Бонус: {points_text(result.bonus)}" if result.bonus > 0 else ""
 
     if is_correct:
-        add_points(cb.from_user.id, pts)
-        if bonus > 0:
-            add_points(cb.from_user.id, bonus)
-
-        verdict = f"{badge}\n✅ Верно! {points_text(pts)}{bonus_text}"
+        verdict = f"{badge}\n✅ Верно! {points_text(result.delta)}{bonus_text}"
         if streak_text:
             verdict += f"\n{streak_text}"
     else:
-        penalty = -ceil(pts / 2)
-        add_points(cb.from_user.id, penalty)
-        verdict = f"{badge}\n❌ Неверно! {points_text(penalty)}"
+        verdict = f"{badge}\n❌ Неверно! {points_text(result.delta)}"
 
     explain = q.get("explain")
     if explain:
         verdict = f"{verdict}\n\n💡 {explain}"
 
-    mark_seen_today(cb.from_user.id, "tf", qid)
-    active_question.pop(cb.from_user.id, None)
-
     # следующий вопрос
-    nxt = pick_unseen_question(cb.from_user.id)
+    nxt = result.next_question
     if not nxt:
         await cb.message.edit_text(f"{verdict}\n\nСегодня вопросы закончились 🎉", reply_markup=stop_kb())
         await cb.answer()
         return
     
-    nxt_pts = int(nxt.get("points", 5))
-    badge = difficulty_badge(nxt_pts)
-                         
     active_question[cb.from_user.id] = nxt
-    await cb.message.edit_text(
-    f"{verdict}\n\nСледующий вопрос:\n\n{badge}\n\n{nxt['text']}",
-    reply_markup=question_kb(nxt["id"])
-)
+    text, kb = rendered_question(nxt)
+    await cb.message.edit_text(f"{verdict}\n\nСледующий вопрос:\n\n{text}", reply_markup=kb)
     await cb.answer()
@@ -0,0 +1,38 @@
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import CallbackQuery, Message, TelegramObject
+
+from services.throttle import FloodGuard
+
+
+class ThrottlingMiddleware(BaseMiddleware):
+    """
+    Outer-middleware для message и callback_query: лимит событий на пользователя
+    и отсев повторных нажатий одной и той же кнопки.
+    Отсечённый callback получает пустой cb.answer() (чтобы кнопка не «висела»)
+    и до хендлеров и хранилища не доходит.
+    """
+
+    def __init__(self, guard: FloodGuard | None = None):
+        self.guard = guard or FloodGuard()
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        user = getattr(event, "from_user", None)
+        if user is None:
+            return await handler(event, data)
+
+        if isinstance(event, CallbackQuery):
+            if not self.guard.allow(user.id, event.data or ""):
+                await event.answer()
+                return None
+        elif isinstance(event, Message):
+            if not self.guard.allow(user.id):
+                return None
+
+        return await handler(event, data)
@@ -0,0 +1,77 @@
+from dataclasses import dataclass
+from math import ceil
+from typing import Any, Dict, Optional
+
+from data.quiz_questions import QUIZ_BANK
+from data.tf_questions import TF_BANK
+from services.progress import answer_seen, next_position, today_key
+from services.scoring import apply_points
+from services.storage import scores, transaction
+from services.streaks import update_streak
+
+_BANKS = {
+    "quiz": QUIZ_BANK,
+    "tf": TF_BANK,
+}
+
+
+@dataclass
+class AnswerResult:
+    delta: int  # очки за сам вопрос: +pts или штраф
+    bonus: int  # бонус за серию (0, если нет)
+    streak: int
+    best_streak: int
+    next_question: Optional[Dict[str, Any]]
+
+
+def _question_at(game: str, pos: Optional[int]) -> Optional[Dict[str, Any]]:
+    return _BANKS[game].at(pos) if pos is not None else None
+
+
+def next_question(user_id: int, game: str) -> Optional[Dict[str, Any]]:
+    """
+    Следующий вопрос из сегодняшней колоды игрока (без перебора банка).
+    """
+    return _question_at(game, next_position(user_id, game))
+
+
+def answer_delta(is_correct: bool, pts: int) -> int:
+    if is_correct:
+        return int(pts)
+    # штраф за ошибку
+    return -ceil(int(pts) / 2)
+
+
+async def record_answer(user_id: int, game: str, qid: int, is_correct: bool, pts: int) -> AnswerResult:
+    """
+    Один ответ в одиночной игре (quiz/tf) — одна транзакция:
+    серия, очки, бонус и отметка «видел сегодня» меняются вместе
+    и уходят на диск одной записью. Заодно выбираем следующий вопрос.
+    """
+    uid = str(user_id)
+    day = today_key()
+    delta = answer_delta(is_correct, pts)
+
+    def apply(_store) -> AnswerResult:
+        with transaction("scores") as (store,):
+            # серия живёт в памяти и уйдёт на диск вместе с этой записью
+            streak, best, bonus = update_streak(user_id, game, is_correct)
+
+            apply_points(store, uid, delta, game, day)
+            # бонус за серию — только при правильном ответе
+            if is_correct and bonus > 0:
+                apply_points(store, uid, bonus, f"{game}:streak", day)
+            else:
+                bonus = 0
+
+            next_pos = answer_seen(store, user_id, game, qid)
+
+        return AnswerResult(
+            delta=delta,
+            bonus=bonus,
+            streak=streak,
+            best_streak=best,
+            next_question=_question_at(game, next_pos),
+        )
+
+    return await scores.call(apply)
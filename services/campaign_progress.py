@@ -1,28 +1,10 @@
-import json
-import os
-from typing import Dict, Any
+from services.storage import namespace, transaction
 
-FILE_PATH = os.path.join("storage", "campaign_progress.json")
-
-
-def _load() -> Dict[str, Any]:
-    if not os.path.exists(FILE_PATH):
-        return {}
-    try:
-        with open(FILE_PATH, "r", encoding="utf-8") as f:
-            return json.load(f) or {}
-    except Exception:
-        return {}
-
-
-def _save(data: Dict[str, Any]) -> None:
-    os.makedirs(os.path.dirname(FILE_PATH), exist_ok=True)
-    with open(FILE_PATH, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+NAMESPACE = "campaign_progress"
 
 
 def get_current_chapter(user_id: int, default: int = 1) -> int:
-    data = _load()
+    data = namespace(NAMESPACE).load()
     ch = data.get(str(user_id), {}).get("chapter", default)
     try:
         return int(ch)
@@ -31,8 +13,5 @@ def get_current_chapter(user_id: int, default: int = 1) -> int:
 
 
 def set_current_chapter(user_id: int, chapter: int) -> None:
-    data = _load()
-    key = str(user_id)
-    data.setdefault(key, {})
-    data[key]["chapter"] = int(chapter)
-    _save(data)
\ No newline at end of file
+    with transaction(NAMESPACE) as (data,):
+        data.setdefault(str(user_id), {})["chapter"] = int(chapter)
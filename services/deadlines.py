@@ -0,0 +1,91 @@
+import asyncio
+import heapq
+import logging
+import time
+from typing import Awaitable, Callable, Optional
+
+log = logging.getLogger(__name__)
+
+
+class DeadlineScheduler:
+    """
+    Одна фоновая задача на все дедлайны вместо спящей корутины на каждый.
+    Дедлайны лежат в min-heap (время, ключ); у ключа не больше одного дедлайна:
+    schedule() его переносит, cancel() снимает (старые записи кучи просто пропускаются).
+    Время — time.time(), чтобы дедлайны можно было сохранить и поднять после рестарта.
+    """
+
+    def __init__(
+        self,
+        callback: Callable[[str], Awaitable[None]],
+        clock: Callable[[], float] = time.time,
+    ):
+        self.callback = callback
+        self._clock = clock
+        self._heap: list[tuple[float, str]] = []
+        self._deadlines: dict[str, float] = {}
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        # колбэки идут отдельными задачами, чтобы медленный не задерживал остальные
+        self._running: set[asyncio.Task] = set()
+
+    def __len__(self) -> int:
+        return len(self._deadlines)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._deadlines
+
+    def schedule(self, key: str, deadline: float) -> None:
+        self._deadlines[key] = deadline
+        if len(self._heap) > 2 * len(self._deadlines) + 64:
+            # снятых/перенесённых записей накопилось много — пересобираем кучу
+            self._heap = [(d, k) for k, d in self._deadlines.items()]
+            heapq.heapify(self._heap)
+        else:
+            heapq.heappush(self._heap, (deadline, key))
+        if self._heap[0] == (deadline, key):
+            # новый дедлайн раньше всех — будим задачу, чтобы пересчитала сон
+            self._wakeup.set()
+
+    def cancel(self, key: str) -> bool:
+        return self._deadlines.pop(key, None) is not None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await asyncio.gather(*self._running, return_exceptions=True)
+
+    def _pop_due(self, now: float) -> list[str]:
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            deadline, key = heapq.heappop(self._heap)
+            if self._deadlines.get(key) == deadline:
+                del self._deadlines[key]
+                due.append(key)
+        return due
+
+    async def _run(self) -> None:
+        while True:
+            for key in self._pop_due(self._clock()):
+                task = asyncio.create_task(self._fire(key))
+                self._running.add(task)
+                task.add_done_callback(self._running.discard)
+
+            self._wakeup.clear()
+            timeout = self._heap[0][0] - self._clock() if self._heap else None
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _fire(self, key: str) -> None:
+        try:
+            await self.callback(key)
+        except Exception:
+            log.exception("Deadline callback failed for %s", key)
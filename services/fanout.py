@@ -0,0 +1,36 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, Iterable, TypeVar, Union
+
+log = logging.getLogger(__name__)
+
+# одновременно в полёте не больше стольких запросов к Telegram на одну рассылку
+FANOUT_LIMIT = 8
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+async def fan_out(
+    recipients: Iterable[R],
+    send: Callable[[R], Awaitable[T]],
+    limit: int = FANOUT_LIMIT,
+) -> list[Union[T, BaseException]]:
+    """
+    Вызывает send(recipient) для всех получателей параллельно (не больше limit сразу).
+    Ошибка одного получателя не мешает остальным: на его месте в результате
+    будет исключение (оно уже залогировано). Порядок результатов — как у recipients.
+    """
+    semaphore = asyncio.Semaphore(max(1, limit))
+
+    async def one(recipient: R) -> T:
+        async with semaphore:
+            return await send(recipient)
+
+    results = await asyncio.gather(*(one(r) for r in recipients), return_exceptions=True)
+    for result in results:
+        if isinstance(result, asyncio.CancelledError):
+            raise result
+        if isinstance(result, Exception):
+            log.warning("Fan-out delivery failed: %r", result)
+    return results
@@ -0,0 +1,135 @@
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Iterator, Optional
+
+# group commit: fsync раз в COMMIT_EVERY событий или раз в COMMIT_INTERVAL_SEC
+COMMIT_EVERY = 64
+COMMIT_INTERVAL_SEC = 0.5
+
+_ACTIVE_NAME = "points.jsonl"
+_SEGMENT_PREFIX = "points-"
+
+
+class PointsLedger:
+    """
+    Журнал начислений: одна строка [seq, uid, delta, ts, source] на событие.
+    Запись — это дописывание в конец файла, без перечитывания остальных.
+    Уже свёрнутые в снимок события уезжают в архивные сегменты points-<seq>.jsonl
+    и остаются там как история: откуда у кого взялись очки.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        commit_every: int = COMMIT_EVERY,
+        commit_interval: float = COMMIT_INTERVAL_SEC,
+    ):
+        self.directory = directory
+        self.commit_every = commit_every
+        self.commit_interval = commit_interval
+
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._last_commit = time.monotonic()
+
+        directory.mkdir(parents=True, exist_ok=True)
+        self._active = directory / _ACTIVE_NAME
+        self._active_count = 0
+        self.last_seq = 0
+
+        for segment in self._segments():
+            self.last_seq = max(self.last_seq, _segment_seq(segment))
+        if self._active.exists():
+            for event in _read_events(self._active):
+                self.last_seq = max(self.last_seq, event[0])
+                self._active_count += 1
+
+        self._fh = self._active.open("a", encoding="utf-8")
+
+    def _segments(self) -> list[Path]:
+        return sorted(self.directory.glob(f"{_SEGMENT_PREFIX}*.jsonl"), key=_segment_seq)
+
+    def append(self, uid: str, delta: int, source: str = "", ts: Optional[int] = None) -> int:
+        """
+        Дописывает событие и возвращает его seq.
+        На диск (fsync) события уходят пачкой — см. commit().
+        """
+        with self._lock:
+            self.last_seq += 1
+            event = [self.last_seq, uid, int(delta), int(ts if ts is not None else time.time()), source]
+            self._fh.write(json.dumps(event, ensure_ascii=False, separators=(",", ":")) + "\n")
+            self._active_count += 1
+            self._pending += 1
+            if self._pending >= self.commit_every or time.monotonic() - self._last_commit >= self.commit_interval:
+                self._commit_unlocked()
+            return self.last_seq
+
+    def _commit_unlocked(self) -> None:
+        self._fh.flush()
+        os.fsync(self._fh.fileno())
+        self._pending = 0
+        self._last_commit = time.monotonic()
+
+    def commit(self) -> bool:
+        with self._lock:
+            if not self._pending:
+                return False
+            self._commit_unlocked()
+            return True
+
+    def replay(self, after_seq: int = 0) -> Iterator[list]:
+        """
+        События с seq > after_seq: архивные сегменты по порядку, затем активный файл.
+        """
+        self.commit()
+        for segment in self._segments():
+            if _segment_seq(segment) <= after_seq:
+                continue
+            for event in _read_events(segment):
+                if event[0] > after_seq:
+                    yield event
+        for event in _read_events(self._active):
+            if event[0] > after_seq:
+                yield event
+
+    def rotate(self, snapshot_seq: int) -> bool:
+        """
+        Компакция: если все события активного файла уже попали в снимок
+        (seq <= snapshot_seq), переносим его в архивный сегмент и начинаем новый.
+        """
+        with self._lock:
+            if not self._active_count or self.last_seq > snapshot_seq:
+                return False
+            self._commit_unlocked()
+            self._fh.close()
+            os.replace(self._active, self.directory / f"{_SEGMENT_PREFIX}{self.last_seq:012d}.jsonl")
+            self._fh = self._active.open("a", encoding="utf-8")
+            self._active_count = 0
+            return True
+
+    def close(self) -> None:
+        with self._lock:
+            self._commit_unlocked()
+            self._fh.close()
+
+
+def _segment_seq(path: Path) -> int:
+    return int(path.stem[len(_SEGMENT_PREFIX):])
+
+
+def _read_events(path: Path) -> Iterator[list]:
+    if not path.exists():
+        return
+    with path.open("r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                # оборванная последняя строка после падения — просто пропускаем
+                continue
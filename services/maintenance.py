@@ -0,0 +1,141 @@
+import asyncio
+import logging
+import time
+from typing import Callable, Optional
+
+from services.progress import prune_progress, today_key
+from services.pvp_storage import expire_matches, get_registry, snapshot_matches
+from services.scoring import (
+    DAILY_KEEP_DAYS,
+    apply_daily_retention,
+    close_ledger,
+    commit_ledger,
+    compact_ledger,
+    flush_last_seen,
+    recover_points,
+)
+from services.storage import flush_scores, get_storage, scores
+
+log = logging.getLogger(__name__)
+
+LEDGER_COMMIT_INTERVAL_SEC = 0.5
+LEDGER_COMPACT_INTERVAL_SEC = 5 * 60
+DAY_ROLLOVER_CHECK_SEC = 60
+LAST_SEEN_FLUSH_SEC = 5 * 60
+PVP_SNAPSHOT_INTERVAL_SEC = 60
+PVP_EXPIRE_INTERVAL_SEC = 60
+# как часто фоновая запись проверяет, не набралось ли flush_every изменений
+FLUSH_CHECK_SEC = 0.5
+
+_daily_keep_days = DAILY_KEEP_DAYS
+# None — окна по умолчанию из services.progress
+_progress_keep_days: Optional[dict[str, int]] = None
+
+
+async def _every(interval: float, job: Callable[[], object]) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await asyncio.to_thread(job)
+        except Exception:
+            log.exception("Background job %s failed", getattr(job, "__name__", job))
+
+
+async def _write_behind(interval: float) -> None:
+    """
+    Единственное место, где файлы хранилища пишутся во время работы:
+    раз в interval или раньше, как только набралось flush_every изменений.
+    """
+    last = time.monotonic()
+    while True:
+        await asyncio.sleep(FLUSH_CHECK_SEC)
+        if not get_storage().flush_due and time.monotonic() - last < interval:
+            continue
+        last = time.monotonic()
+        try:
+            await asyncio.to_thread(flush_scores)
+        except Exception:
+            log.exception("Storage flush failed")
+
+
+async def _snapshot_matches_every(interval: float) -> None:
+    # не через _every: копию матчей снимаем в event loop, пишет snapshot_matches сам в потоке
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await snapshot_matches()
+        except Exception:
+            log.exception("PvP snapshot failed")
+
+
+def _on_new_day() -> None:
+    archived = apply_daily_retention(_daily_keep_days)
+    if archived:
+        log.info("Retention: archived %s daily buckets", archived)
+    pruned = prune_progress(_progress_keep_days)
+    if pruned:
+        log.info("Retention: pruned %s progress buckets", pruned)
+
+
+async def _watch_day_rollover() -> None:
+    day = today_key()
+    while True:
+        await asyncio.sleep(DAY_ROLLOVER_CHECK_SEC)
+        if today_key() == day:
+            continue
+        day = today_key()
+        try:
+            await asyncio.to_thread(_on_new_day)
+        except Exception:
+            log.exception("Day rollover jobs failed")
+
+
+def startup(daily_keep_days: int = DAILY_KEEP_DAYS, progress_keep_days: Optional[dict[str, int]] = None) -> None:
+    """
+    Восстановление состояния и уборка перед стартом поллинга.
+    """
+    global _daily_keep_days, _progress_keep_days
+    _daily_keep_days = daily_keep_days
+    _progress_keep_days = progress_keep_days
+
+    replayed = recover_points()
+    if replayed:
+        log.info("Ledger: replayed %s point events", replayed)
+    # поднимаем PvP-матчи из снимка и журнала и сразу сворачиваем журнал
+    get_registry().snapshot()
+    _on_new_day()
+
+
+def start_jobs(flush_interval: float) -> list[asyncio.Task]:
+    return [
+        asyncio.create_task(_watch_day_rollover()),
+        # write-behind файлов хранилища: по порогу flush_every или по интервалу
+        asyncio.create_task(_write_behind(flush_interval)),
+        # group commit журнала очков
+        asyncio.create_task(_every(LEDGER_COMMIT_INTERVAL_SEC, commit_ledger)),
+        asyncio.create_task(_every(LEDGER_COMPACT_INTERVAL_SEC, compact_ledger)),
+        # время последнего визита: не чаще раза в несколько минут
+        asyncio.create_task(_every(LAST_SEEN_FLUSH_SEC, flush_last_seen)),
+        # снимок PvP-реестра: журнал между снимками остаётся коротким
+        asyncio.create_task(_snapshot_matches_every(PVP_SNAPSHOT_INTERVAL_SEC)),
+        # брошенные PvP-матчи (вместо уборки в каждом хендлере)
+        asyncio.create_task(_every(PVP_EXPIRE_INTERVAL_SEC, expire_matches)),
+    ]
+
+
+async def shutdown(tasks: list[asyncio.Task]) -> None:
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    await scores.close()
+
+    # дописываем всё, что накопилось в памяти, перед выходом
+    flush_last_seen()
+    await snapshot_matches()
+    # серии и прочие пространства (при SQLite compact_ledger их не трогает)
+    flush_scores()
+    commit_ledger()
+    compact_ledger()
+    # после последней записи: файл журнала и, при SQLite, соединение с базой
+    close_ledger()
+    get_storage().close()
@@ -0,0 +1,86 @@
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+# ширина полосы по общим очкам: соперника ищем в своей полосе, потом в соседних
+POINTS_BAND = 100
+# сколько игрок ждёт своих по очкам, прежде чем сгодится любой соперник
+FALLBACK_AFTER_SEC = 10.0
+
+
+class MatchmakingQueue:
+    """
+    Очередь «найти соперника» в памяти: полоса очков -> ожидающие игроки
+    (OrderedDict: первым в паре оказывается тот, кто ждёт дольше).
+    Полосы — только предпочтение: если рядом по очкам никого нет, а кто-то
+    ждёт дольше fallback_after секунд, пара достаётся ему, в какой бы полосе он ни был.
+    Встать, выйти и найти пару — O(1): смотрим не больше трёх полос и голову общей очереди.
+    Живёт в event loop и без await внутри, поэтому локи не нужны.
+    """
+
+    def __init__(self, band: Optional[int] = POINTS_BAND, fallback_after: float = FALLBACK_AFTER_SEC):
+        # band=0 или None — без полос, все в одной очереди
+        self.band = band
+        self.fallback_after = fallback_after
+        self._bands: dict[int, "OrderedDict[int, Any]"] = {}
+        # все ожидающие в порядке прихода: uid -> (полоса, с какого момента ждёт)
+        self._waiting: "OrderedDict[int, tuple[int, float]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._waiting)
+
+    def __contains__(self, user_id: int) -> bool:
+        return user_id in self._waiting
+
+    def _band(self, points: int) -> int:
+        if not self.band:
+            return 0
+        return max(0, int(points)) // self.band
+
+    def _take(self, user_id: int) -> Any:
+        band, _since = self._waiting.pop(user_id)
+        waiting = self._bands[band]
+        seat = waiting.pop(user_id)
+        if not waiting:
+            del self._bands[band]
+        return seat
+
+    def join(
+        self, user_id: int, points: int, seat: Any = None, now: Optional[float] = None
+    ) -> Optional[tuple[int, Any]]:
+        """
+        Ищет ожидающего соперника: сначала поблизости по очкам, потом любого,
+        кто ждёт дольше fallback_after.
+        Нашёлся — убирает его из очереди и возвращает (его id, его seat);
+        нет — ставит игрока в очередь (seat — что угодно для хендлера) и возвращает None.
+        """
+        if user_id in self._waiting:
+            # уже ждёт — просто обновим, куда ему потом писать
+            self._bands[self._waiting[user_id][0]][user_id] = seat
+            return None
+
+        band = self._band(points)
+        for candidate in (band, band - 1, band + 1):
+            waiting = self._bands.get(candidate)
+            if waiting:
+                opponent = next(iter(waiting))
+                return opponent, self._take(opponent)
+
+        now = time.monotonic() if now is None else now
+        if self._waiting:
+            # рядом никого; самый давний ждёт достаточно — сгодится и дальний соперник
+            opponent = next(iter(self._waiting))
+            if now - self._waiting[opponent][1] >= self.fallback_after:
+                return opponent, self._take(opponent)
+
+        self._bands.setdefault(band, OrderedDict())[user_id] = seat
+        self._waiting[user_id] = (band, now)
+        return None
+
+    def leave(self, user_id: int) -> Optional[Any]:
+        """
+        Убирает игрока из очереди и возвращает его seat (None, если он не ждал).
+        """
+        if user_id not in self._waiting:
+            return None
+        return self._take(user_id)
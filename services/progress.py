@@ -1,35 +1,222 @@
-from datetime import datetime
+import base64
+import random
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Iterator, Optional
 from zoneinfo import ZoneInfo
 
-from services.storage import load_scores, save_scores
+from data.quiz_questions import QUIZ_BANK
+from data.tf_questions import TF_BANK
+from services.storage import get_store
 
 TZ = ZoneInfo("Europe/Amsterdam")
 
+# qid -> позиция вопроса в банке; бит с этим номером = «видел сегодня»
+_POSITIONS = {
+    "quiz": QUIZ_BANK.positions,
+    "tf": TF_BANK.positions,
+}
+
+# сколько дней (включая сегодня) хранить прогресс каждой игры; читается только сегодняшний
+PROGRESS_KEEP_DAYS = {"quiz": 1, "tf": 1}
+DEFAULT_KEEP_DAYS = 1
+
 def today_key() -> str:
     return datetime.now(TZ).strftime("%Y-%m-%d")
 
+
+class SeenBits:
+    """
+    Что игрок видел сегодня в одной игре: битовая маска по позициям вопросов в банке.
+    В scores.json хранится как base64 — несколько байт вместо списка id.
+    Проверка и отметка — один битовый сдвиг.
+    """
+
+    __slots__ = ("bits", "positions")
+
+    def __init__(self, bits: int, positions: dict[int, int]):
+        self.bits = bits
+        self.positions = positions
+
+    @classmethod
+    def decode(cls, raw, positions: dict[int, int]) -> "SeenBits":
+        if not raw:
+            return cls(0, positions)
+        if isinstance(raw, list):
+            # старый формат: список id
+            seen = cls(0, positions)
+            for qid in raw:
+                seen.add(int(qid))
+            return seen
+        return cls(int.from_bytes(base64.b64decode(raw), "little"), positions)
+
+    def encode(self) -> str:
+        raw = self.bits.to_bytes((self.bits.bit_length() + 7) // 8, "little")
+        return base64.b64encode(raw).decode("ascii")
+
+    def __contains__(self, qid: int) -> bool:
+        pos = self.positions.get(qid)
+        return pos is not None and bool(self.bits >> pos & 1)
+
+    def add(self, qid: int) -> None:
+        pos = self.positions.get(qid)
+        if pos is not None:
+            self.bits |= 1 << pos
+
+    def __len__(self) -> int:
+        return self.bits.bit_count()
+
+    def __iter__(self) -> Iterator[int]:
+        return (qid for qid, pos in self.positions.items() if self.bits >> pos & 1)
+
+
+def seen_today(user_id: int, game: str) -> SeenBits:
+    raw, _cursor = get_store().get_progress(game, today_key(), str(user_id))
+    return SeenBits.decode(raw, _POSITIONS[game])
+
 def get_seen_today(user_id: int, game: str) -> set[int]:
-    data = load_scores()
+    return set(seen_today(user_id, game))
+
+def count_seen_today(user_id: int, game: str) -> int:
+    return len(seen_today(user_id, game))
+
+def mark_seen_today(user_id: int, game: str, qid: int) -> None:
+    mark_seen(get_store(), user_id, game, qid)
+
+def mark_seen(store, user_id: int, game: str, qid: int) -> SeenBits:
+    """
+    Отмечает вопрос над уже открытым хранилищем очков (для транзакций).
+    Возвращает всё, что игрок видел сегодня, вместе с этим вопросом.
+    """
     day = today_key()
     uid = str(user_id)
+    with store.lock:
+        raw, _cursor = store.get_progress(game, day, uid)
+        seen = SeenBits.decode(raw, _POSITIONS[game])
+        seen.add(int(qid))
+        store.set_progress(game, day, uid, seen=seen.encode())
+    return seen
 
-    data.setdefault("progress", {})
-    data["progress"].setdefault(game, {})
-    data["progress"][game].setdefault(day, {})
-    seen_list = data["progress"][game][day].get(uid, [])
-    return set(int(x) for x in seen_list)
 
-def mark_seen_today(user_id: int, game: str, qid: int) -> None:
-    data = load_scores()
+# --- колода: у каждого игрока на каждый день своя перестановка вопросов ---
+#
+# progress["decks"][game][day][uid] = курсор. Сама перестановка не хранится:
+# она восстанавливается из сида (game, day, uid), так что на диске только одно число.
+
+class Deck:
+    """
+    Перестановка range(size), заданная сидом: deck[i] считается на лету
+    (сеть Фейстеля на 4 раунда + cycle-walking), а не хранится списком.
+    В памяти — четыре ключа, карта — O(1) независимо от размера банка.
+    """
+
+    __slots__ = ("size", "half", "mask", "keys")
+
+    ROUNDS = 4
+
+    def __init__(self, size: int, seed: str):
+        self.size = size
+        # домен Фейстеля — 2^(2*half) >= size, то есть меньше чем в 4 раза больше банка
+        bits = max(2, (size - 1).bit_length())
+        self.half = (bits + 1) // 2
+        self.mask = (1 << self.half) - 1
+        rng = random.Random(seed)
+        self.keys = tuple(rng.getrandbits(32) for _ in range(self.ROUNDS))
+
+    def __len__(self) -> int:
+        return self.size
+
+    def _round(self, value: int, key: int) -> int:
+        x = (value ^ key) * 0x9E3779B1 & 0xFFFFFFFF
+        x ^= x >> 16
+        return (x * 0x85EBCA6B & 0xFFFFFFFF) >> (32 - self.half)
+
+    def _permute(self, value: int) -> int:
+        left, right = value >> self.half, value & self.mask
+        for key in self.keys:
+            left, right = right, left ^ self._round(right, key)
+        return left << self.half | right
+
+    def __getitem__(self, index: int) -> int:
+        if not 0 <= index < self.size:
+            raise IndexError(index)
+        # выпали за банк — переставляем ещё раз; на range(size) это тоже перестановка
+        value = self._permute(index)
+        while value >= self.size:
+            value = self._permute(value)
+        return value
+
+
+@lru_cache(maxsize=4096)
+def _deck(game: str, day: str, uid: str) -> Deck:
+    return Deck(len(_POSITIONS[game]), f"{game}:{day}:{uid}")
+
+def _skip_seen(deck: Deck, cursor: int, seen: SeenBits) -> int:
+    # уже отвеченные карты пропускаем (в среднем — ноль или одна)
+    while cursor < len(deck) and seen.bits >> deck[cursor] & 1:
+        cursor += 1
+    return cursor
+
+def next_position(user_id: int, game: str) -> Optional[int]:
+    """
+    Позиция в банке следующего вопроса на сегодня или None, если колода кончилась.
+    Только чтение: курсор сдвигается в advance_deck.
+    """
     day = today_key()
     uid = str(user_id)
+    raw, cursor = get_store().get_progress(game, day, uid)
+    seen = SeenBits.decode(raw, _POSITIONS[game])
+    deck = _deck(game, day, uid)
+    cursor = _skip_seen(deck, cursor or 0, seen)
+    return deck[cursor] if cursor < len(deck) else None
+
+def advance_deck(store, user_id: int, game: str, seen: SeenBits) -> Optional[int]:
+    """
+    После ответа (внутри транзакции): двигает курсор за отвеченные вопросы
+    и возвращает позицию следующего.
+    """
+    day = today_key()
+    uid = str(user_id)
+    deck = _deck(game, day, uid)
+    with store.lock:
+        _raw, cursor = store.get_progress(game, day, uid)
+        cursor = _skip_seen(deck, cursor or 0, seen)
+        store.set_progress(game, day, uid, cursor=cursor)
+    return deck[cursor] if cursor < len(deck) else None
+
+def answer_seen(store, user_id: int, game: str, qid: int) -> Optional[int]:
+    """
+    mark_seen + advance_deck одной записью (для record_answer):
+    отметка и курсор игрока лежат в одной строке прогресса.
+    Возвращает позицию следующего вопроса.
+    """
+    day = today_key()
+    uid = str(user_id)
+    deck = _deck(game, day, uid)
+    with store.lock:
+        raw, cursor = store.get_progress(game, day, uid)
+        seen = SeenBits.decode(raw, _POSITIONS[game])
+        seen.add(int(qid))
+        cursor = _skip_seen(deck, cursor or 0, seen)
+        store.set_progress(game, day, uid, seen=seen.encode(), cursor=cursor)
+    return deck[cursor] if cursor < len(deck) else None
+
+def questions_left(user_id: int, game: str) -> int:
+    return len(_POSITIONS[game]) - count_seen_today(user_id, game)
+
 
-    data.setdefault("progress", {})
-    data["progress"].setdefault(game, {})
-    data["progress"][game].setdefault(day, {})
-    data["progress"][game][day].setdefault(uid, [])
+def prune_progress(keep_days: Optional[dict[str, int]] = None) -> int:
+    """
+    Убирает из прогресса старые дни (и их курсоры колод).
+    keep_days — окно по играм, по умолчанию PROGRESS_KEEP_DAYS.
+    Возвращает количество удалённых дневных корзин.
+    """
+    windows = dict(PROGRESS_KEEP_DAYS)
+    windows.update(keep_days or {})
+    now = datetime.now(TZ)
 
-    if qid not in data["progress"][game][day][uid]:
-        data["progress"][game][day][uid].append(qid)
+    def cutoff(game: str) -> str:
+        days = max(1, windows.get(game, DEFAULT_KEEP_DAYS))
+        return (now - timedelta(days=days - 1)).strftime("%Y-%m-%d")
 
-    save_scores(data)
\ No newline at end of file
+    return get_store().drop_progress_before(cutoff)
@@ -1,78 +1,244 @@
+import asyncio
+import copy
+import heapq
 import json
-import os
+import logging
+import threading
 import time
+import weakref
 from pathlib import Path
-from typing import Any, Dict, Optional
-import asyncio
+from typing import Any, Dict, Iterator, Optional
 
-_STORAGE_DIR = Path(__file__).resolve().parent.parent / "storage"
-_STORAGE_DIR.mkdir(parents=True, exist_ok=True)
+from services.storage import Storage, get_storage
 
-_MATCHES_PATH = _STORAGE_DIR / "pvp_matches.json"
+log = logging.getLogger(__name__)
 
-_lock = asyncio.Lock()
+NAMESPACE = "pvp_matches"
+JOURNAL_NAME = "pvp_journal.jsonl"
 
+# матч без активности дольше этого удаляется (см. expire_matches)
+MATCH_TTL_SEC = 60 * 60
 
-def _load_json(path: Path) -> Dict[str, Any]:
+
+class MatchRegistry:
+    """
+    Активные PvP-матчи в памяти процесса: match_id -> dict матча.
+    Каждое изменение дописывается строкой в журнал (["put", id, match] / ["del", id]),
+    а снимок всего реестра (pvp_matches.json) пишется периодически и при остановке.
+    После падения: снимок + журнал поверх него.
+    """
+
+    def __init__(self, storage: Storage):
+        self.storage = storage
+        self._lock = threading.Lock()
+        self._journal = storage.directory / JOURNAL_NAME
+        self._rotated = self._journal.with_suffix(".jsonl.old")
+
+        self._matches: Dict[str, Dict[str, Any]] = copy.deepcopy(storage.namespace(NAMESPACE).load())
+        # .old — журнал, снимок по которому мог не успеть записаться
+        for path in (self._rotated, self._journal):
+            for op in _read_journal(path):
+                self._apply(op)
+
+        # индекс протухания: min-heap (updated_at, match_id) + актуальный updated_at матча;
+        # записи кучи, которые уже не совпадают с _touched, — устаревшие и пропускаются
+        self._touched: Dict[str, int] = {mid: _updated_at(m) for mid, m in self._matches.items()}
+        self._expiry = [(stamp, mid) for mid, stamp in self._touched.items()]
+        heapq.heapify(self._expiry)
+
+        self._journal.parent.mkdir(parents=True, exist_ok=True)
+        self._fh = self._journal.open("a", encoding="utf-8")
+
+    def __len__(self) -> int:
+        return len(self._matches)
+
+    def _apply(self, op: list) -> None:
+        if op[0] == "put":
+            self._matches[op[1]] = op[2]
+        elif op[0] == "del":
+            self._matches.pop(op[1], None)
+
+    def _log(self, op: list) -> None:
+        # без fsync: журнал спасает от падения процесса, матчи всё равно живут недолго
+        self._fh.write(json.dumps(op, ensure_ascii=False, separators=(",", ":")) + "\n")
+        self._fh.flush()
+
+    def get(self, match_id: str) -> Optional[Dict[str, Any]]:
+        return self._matches.get(match_id)
+
+    def put(self, match_id: str, match: Dict[str, Any]) -> None:
+        with self._lock:
+            self._matches[match_id] = match
+            self._log(["put", match_id, match])
+            self._touch(match_id, _updated_at(match))
+
+    def _touch(self, match_id: str, stamp: int) -> None:
+        if self._touched.get(match_id) == stamp:
+            return
+        self._touched[match_id] = stamp
+        if len(self._expiry) > 2 * len(self._touched) + 64:
+            self._expiry = [(s, mid) for mid, s in self._touched.items()]
+            heapq.heapify(self._expiry)
+        else:
+            heapq.heappush(self._expiry, (stamp, match_id))
+
+    def delete(self, match_id: str) -> bool:
+        with self._lock:
+            return self._delete_unlocked(match_id)
+
+    def _delete_unlocked(self, match_id: str) -> bool:
+        self._touched.pop(match_id, None)
+        if self._matches.pop(match_id, None) is None:
+            return False
+        self._log(["del", match_id])
+        return True
+
+    def expire(self, ttl_seconds: int, now: Optional[int] = None) -> int:
+        """
+        Удаляет матчи без активности дольше ttl_seconds.
+        Смотрит только на вершину кучи: стоимость — по числу протухших, а не всех матчей.
+        """
+        cutoff = (int(time.time()) if now is None else now) - ttl_seconds
+        removed = 0
+        with self._lock:
+            while self._expiry and self._expiry[0][0] < cutoff:
+                stamp, mid = heapq.heappop(self._expiry)
+                if self._touched.get(mid) == stamp and self._delete_unlocked(mid):
+                    removed += 1
+        return removed
+
+    def items(self) -> list[tuple[str, Dict[str, Any]]]:
+        with self._lock:
+            return list(self._matches.items())
+
+    def rotate(self) -> Optional[Dict[str, Dict[str, Any]]]:
+        """
+        Копия реестра для снимка; журнал с этого момента пишется заново.
+        None — с прошлого снимка ничего не менялось.
+        Вызывать из потока, который меняет матчи (event loop): хендлеры правят
+        живые объекты без лока, копировать их из другого потока нельзя.
+        """
+        with self._lock:
+            if not self._fh.tell():
+                return None
+            matches = copy.deepcopy(self._matches)
+            # новые изменения пойдут в свежий журнал, пока пишется снимок
+            self._fh.close()
+            if self._rotated.exists():
+                # прошлый снимок не записался — его журнал нужен до следующего удачного
+                with self._rotated.open("a", encoding="utf-8") as old:
+                    old.write(self._journal.read_text(encoding="utf-8"))
+                self._journal.unlink()
+            else:
+                self._journal.replace(self._rotated)
+            self._fh = self._journal.open("a", encoding="utf-8")
+        return matches
+
+    def write_snapshot(self, matches: Dict[str, Dict[str, Any]]) -> None:
+        self.storage.namespace(NAMESPACE).save(matches)
+        self.storage.flush()
+        # снимок на диске — старый журнал больше не нужен
+        self._rotated.unlink(missing_ok=True)
+
+    def snapshot(self) -> bool:
+        """
+        Пишет снимок реестра и обрезает журнал.
+        Возвращает False, если с прошлого снимка ничего не менялось.
+        """
+        matches = self.rotate()
+        if matches is None:
+            return False
+        self.write_snapshot(matches)
+        return True
+
+    def close(self) -> None:
+        self.snapshot()
+        with self._lock:
+            self._fh.close()
+
+
+def _updated_at(match: Dict[str, Any]) -> int:
+    stamp = match.get("updated_at", match.get("created_at"))
+    return int(stamp if stamp is not None else time.time())
+
+
+def _read_journal(path: Path) -> Iterator[list]:
     if not path.exists():
-        return {}
-    try:
-        with path.open("r", encoding="utf-8") as f:
-            data = json.load(f)
-        if isinstance(data, dict):
-            return data
-        return {}
-    except Exception:
-        return {}
+        return
+    with path.open("r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                # оборванная последняя строка после падения — просто пропускаем
+                log.warning("Skipping broken line in %s", path)
+
+
+_registry: Optional[MatchRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_registry() -> MatchRegistry:
+    global _registry
+    storage = get_storage()
+    registry = _registry
+    if registry is not None and registry.storage is storage:
+        return registry
+    with _registry_lock:
+        # хранилище могли пересоздать (configure_store) — тогда поднимаем реестр заново
+        if _registry is None or _registry.storage is not storage:
+            _registry = MatchRegistry(storage)
+        return _registry
+
+
+async def snapshot_matches() -> bool:
+    """
+    Копия реестра снимается в event loop, запись на диск — в отдельном потоке.
+    """
+    registry = get_registry()
+    matches = registry.rotate()
+    if matches is None:
+        return False
+    await asyncio.to_thread(registry.write_snapshot, matches)
+    return True
+
+
+# лок живёт, пока его кто-то держит или ждёт; потом уходит из словаря сам
+_match_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
 
 
-def _atomic_write_json(path: Path, data: Dict[str, Any]) -> None:
-    tmp = path.with_suffix(".tmp")
-    with tmp.open("w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
-    os.replace(tmp, path)
+def match_lock(match_id: str) -> asyncio.Lock:
+    """
+    Лок одного матча: изменения одного матча идут строго по очереди
+    (проверка + запись + отправка сообщений), разные матчи — параллельно.
+    """
+    lock = _match_locks.get(match_id)
+    if lock is None:
+        lock = _match_locks[match_id] = asyncio.Lock()
+    return lock
 
 
 async def get_match(match_id: str) -> Optional[Dict[str, Any]]:
-    async with _lock:
-        data = _load_json(_MATCHES_PATH)
-        return data.get(match_id)
+    # живой объект из реестра: изменения фиксируются (и попадают в журнал) через upsert_match
+    return get_registry().get(match_id)
 
 
 async def upsert_match(match_id: str, match: Dict[str, Any]) -> None:
-    async with _lock:
-        data = _load_json(_MATCHES_PATH)
-        data[match_id] = match
-        _atomic_write_json(_MATCHES_PATH, data)
+    get_registry().put(match_id, match)
 
 
 async def delete_match(match_id: str) -> None:
-    async with _lock:
-        data = _load_json(_MATCHES_PATH)
-        if match_id in data:
-            data.pop(match_id, None)
-            _atomic_write_json(_MATCHES_PATH, data)
+    get_registry().delete(match_id)
 
 
-async def cleanup_expired(ttl_seconds: int = 60 * 60) -> int:
+def expire_matches(ttl_seconds: int = MATCH_TTL_SEC) -> int:
     """
     Удаляет матчи, которые лежат слишком долго без активности (по updated_at).
-    Возвращает количество удалённых.
+    Возвращает количество удалённых. Вызывается фоновой задачей (services.maintenance),
+    хендлерам чистить ничего не нужно.
     """
-    now = int(time.time())
-    removed = 0
-    async with _lock:
-        data = _load_json(_MATCHES_PATH)
-        to_delete = []
-        for mid, m in data.items():
-            updated_at = int(m.get("updated_at", m.get("created_at", now)))
-            if now - updated_at > ttl_seconds:
-                to_delete.append(mid)
-
-        for mid in to_delete:
-            data.pop(mid, None)
-            removed += 1
-
-        if removed:
-            _atomic_write_json(_MATCHES_PATH, data)
-    return removed
\ No newline at end of file
+    return get_registry().expire(ttl_seconds)
+
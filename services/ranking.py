@@ -0,0 +1,171 @@
+from bisect import bisect_left, bisect_right, insort
+from itertools import chain, islice
+from typing import Iterable, Optional
+
+try:
+    from sortedcontainers import SortedList
+except ImportError:  # pragma: no cover - необязательная зависимость
+    SortedList = None
+
+# размер корзины запасного отсортированного списка (как load у SortedList)
+_LOAD = 500
+
+# для скольких последних дней хранилища держат индекс дневного лидерборда
+DAILY_INDEX_DAYS = 2
+
+
+class _BucketList:
+    """
+    Запасной вариант, если sortedcontainers не установлен — та же идея, что у SortedList:
+    отсортированные корзины по _LOAD..2*_LOAD элементов, их максимумы и дерево Фенвика
+    по размерам корзин. Вставка, удаление и bisect — O(log N) плюс сдвиг внутри одной
+    корзины; дерево пересобирается только при делении или исчезновении корзины.
+    """
+
+    def __init__(self, items: Iterable = ()):
+        items = sorted(items)
+        self._buckets = [items[i:i + _LOAD] for i in range(0, len(items), _LOAD)]
+        self._maxes = [bucket[-1] for bucket in self._buckets]
+        self._len = len(items)
+        self._rebuild_tree()
+
+    def _rebuild_tree(self) -> None:
+        tree = [0] * (len(self._buckets) + 1)
+        for i, bucket in enumerate(self._buckets, 1):
+            tree[i] += len(bucket)
+            parent = i + (i & -i)
+            if parent < len(tree):
+                tree[parent] += tree[i]
+        self._tree = tree
+
+    def _tree_add(self, pos: int, delta: int) -> None:
+        i = pos + 1
+        while i < len(self._tree):
+            self._tree[i] += delta
+            i += i & -i
+
+    def _count_before(self, pos: int) -> int:
+        # сколько элементов в корзинах [0, pos)
+        total = 0
+        while pos > 0:
+            total += self._tree[pos]
+            pos -= pos & -pos
+        return total
+
+    def add(self, item) -> None:
+        if not self._buckets:
+            self._buckets, self._maxes, self._len = [[item]], [item], 1
+            self._rebuild_tree()
+            return
+        pos = min(bisect_left(self._maxes, item), len(self._buckets) - 1)
+        bucket = self._buckets[pos]
+        insort(bucket, item)
+        self._maxes[pos] = bucket[-1]
+        self._len += 1
+        if len(bucket) > 2 * _LOAD:
+            self._buckets[pos:pos + 1] = [bucket[:_LOAD], bucket[_LOAD:]]
+            self._maxes[pos:pos + 1] = [bucket[_LOAD - 1], bucket[-1]]
+            self._rebuild_tree()
+        else:
+            self._tree_add(pos, 1)
+
+    def remove(self, item) -> None:
+        pos = bisect_left(self._maxes, item)
+        bucket = self._buckets[pos] if pos < len(self._buckets) else []
+        i = bisect_left(bucket, item)
+        if i == len(bucket) or bucket[i] != item:
+            raise ValueError(f"{item!r} not in list")
+        del bucket[i]
+        self._len -= 1
+        if bucket:
+            self._maxes[pos] = bucket[-1]
+            self._tree_add(pos, -1)
+        else:
+            del self._buckets[pos]
+            del self._maxes[pos]
+            self._rebuild_tree()
+
+    def bisect_left(self, item) -> int:
+        pos = bisect_left(self._maxes, item)
+        if pos == len(self._buckets):
+            return self._len
+        return self._count_before(pos) + bisect_left(self._buckets[pos], item)
+
+    def bisect_right(self, item) -> int:
+        pos = bisect_right(self._maxes, item)
+        if pos == len(self._buckets):
+            return self._len
+        return self._count_before(pos) + bisect_right(self._buckets[pos], item)
+
+    def __iter__(self):
+        return chain.from_iterable(self._buckets)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self._len)
+            if step != 1:
+                return list(self)[index]
+            # топ-K: идём с начала, не собирая весь список
+            return list(islice(self, start, stop))
+        if index < 0:
+            index += self._len
+        if not 0 <= index < self._len:
+            raise IndexError("list index out of range")
+        for bucket in self._buckets:
+            if index < len(bucket):
+                return bucket[index]
+            index -= len(bucket)
+
+    def __len__(self) -> int:
+        return self._len
+
+
+def _sorted_list(items: Iterable = ()):
+    if SortedList is not None:
+        return SortedList(items)
+    return _BucketList(items)
+
+
+class RankIndex:
+    """
+    Рейтинг uid -> очки, который поддерживается инкрементально.
+    Ключи (-points, uid) лежат в отсортированном контейнере:
+    обновление — O(log N), топ-K — O(K).
+    """
+
+    def __init__(self, points: Optional[dict] = None):
+        self._points: dict[str, int] = dict(points or {})
+        self._keys = _sorted_list((-pts, uid) for uid, pts in self._points.items())
+
+    def __len__(self) -> int:
+        return len(self._points)
+
+    def get(self, uid: str) -> Optional[int]:
+        return self._points.get(uid)
+
+    def set(self, uid: str, points: int) -> None:
+        old = self._points.get(uid)
+        if old is not None:
+            if old == points:
+                return
+            self._keys.remove((-old, uid))
+        self._points[uid] = points
+        self._keys.add((-points, uid))
+
+    def add(self, uid: str, delta: int) -> int:
+        points = self._points.get(uid, 0) + delta
+        self.set(uid, points)
+        return points
+
+    def top(self, limit: int) -> list[tuple[str, int]]:
+        return [(uid, -neg) for neg, uid in self._keys[:limit]]
+
+    def rank(self, uid: str) -> Optional[int]:
+        """
+        Место игрока (1 — лучший). При равных очках место общее:
+        считаем только тех, у кого очков строго больше.
+        """
+        points = self._points.get(uid)
+        if points is None:
+            return None
+        return self._keys.bisect_left((-points,)) + 1
@@ -0,0 +1,88 @@
+import gzip
+import json
+import os
+from pathlib import Path
+from typing import Iterator, Optional
+
+from services.storage import STORAGE_DIR
+
+ARCHIVE_DIR = STORAGE_DIR / "archive"
+
+
+def _month_path(month: str) -> Path:
+    return ARCHIVE_DIR / f"daily-{month}.json.gz"
+
+
+def load_month(month: str) -> dict[str, dict]:
+    """
+    Все дневные корзины за месяц "YYYY-MM": {day: {uid: points}}.
+    """
+    path = _month_path(month)
+    if not path.exists():
+        return {}
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _write_month(month: str, days: dict[str, dict]) -> None:
+    ARCHIVE_DIR.mkdir(parents=True, exist_ok=True)
+    path = _month_path(month)
+    tmp = path.with_suffix(".tmp")
+    with gzip.open(tmp, "wt", encoding="utf-8") as f:
+        json.dump(days, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp, path)
+
+
+def archive_days(days: dict[str, dict]) -> int:
+    """
+    Складывает дневные корзины в помесячные архивы.
+    День перезаписывается целиком, так что повторный вызов с теми же днями безопасен.
+    """
+    by_month: dict[str, dict] = {}
+    for day, bucket in days.items():
+        by_month.setdefault(day[:7], {})[day] = bucket
+
+    for month, month_days in by_month.items():
+        merged = load_month(month)
+        merged.update(month_days)
+        _write_month(month, merged)
+    return len(days)
+
+
+def months() -> list[str]:
+    if not ARCHIVE_DIR.exists():
+        return []
+    return sorted(p.name[len("daily-"):-len(".json.gz")] for p in ARCHIVE_DIR.glob("daily-*.json.gz"))
+
+
+# --- офлайн-отчёты по архиву ---
+
+def iter_days(start: Optional[str] = None, end: Optional[str] = None) -> Iterator[tuple[str, dict]]:
+    """
+    (day, {uid: points}) по порядку дат, start/end включительно ("YYYY-MM-DD").
+    """
+    for month in months():
+        if start and month < start[:7]:
+            continue
+        if end and month > end[:7]:
+            break
+        for day, bucket in sorted(load_month(month).items()):
+            if start and day < start:
+                continue
+            if end and day > end:
+                continue
+            yield day, bucket
+
+
+def user_history(user_id: int, start: Optional[str] = None, end: Optional[str] = None) -> list[tuple[str, int]]:
+    uid = str(user_id)
+    return [(day, bucket[uid]) for day, bucket in iter_days(start, end) if uid in bucket]
+
+
+def period_leaderboard(start: Optional[str] = None, end: Optional[str] = None, limit: int = 10) -> list[tuple[int, int]]:
+    totals: dict[str, int] = {}
+    for _day, bucket in iter_days(start, end):
+        for uid, pts in bucket.items():
+            totals[uid] = totals.get(uid, 0) + pts
+    items = sorted(totals.items(), key=lambda x: x[1], reverse=True)
+    return [(int(uid), pts) for uid, pts in items[:limit]]
@@ -1,77 +1,225 @@
-from datetime import datetime
+from datetime import datetime, timedelta
+from typing import Optional
 from zoneinfo import ZoneInfo
 
-from services.storage import load_scores, update_scores
+from services.ledger import PointsLedger
+from services.score_archive import archive_days
+from services.storage import STORAGE_DIR, get_store, scores
 
 TZ = ZoneInfo("Europe/Amsterdam")
 
+LEDGER_DIR = STORAGE_DIR / "ledger"
+
+# сколько последних дней (включая сегодня) держим в живом scores.json
+DAILY_KEEP_DAYS = 14
+
+_ledger: Optional[PointsLedger] = None
+
+# uid -> display для лидербордов; upsert_user обновляет запись
+_display_cache: dict[str, str] = {}
+
+# uid -> (display, username, full_name), как они сейчас лежат в хранилище
+_identity_cache: dict[str, tuple[str, str, str]] = {}
+
+# uid -> updated_at, ещё не записанный на диск (см. flush_last_seen)
+_pending_seen: dict[str, str] = {}
+
 def _today_key() -> str:
     return datetime.now(TZ).strftime("%Y-%m-%d")
 
+def _day_key(ts: int) -> str:
+    return datetime.fromtimestamp(ts, TZ).strftime("%Y-%m-%d")
+
+def get_ledger() -> PointsLedger:
+    global _ledger
+    if _ledger is None:
+        _ledger = PointsLedger(LEDGER_DIR)
+    return _ledger
+
+def _now_iso() -> str:
+    return datetime.now(TZ).isoformat(timespec="seconds")
+
+def _stored_identity(uid: str) -> Optional[tuple[str, str, str]]:
+    if uid not in _identity_cache:
+        record = get_store().get_user(uid)
+        if record is None:
+            return None
+        _identity_cache[uid] = (record.get("display", ""), record.get("username", ""), record.get("full_name", ""))
+    return _identity_cache[uid]
+
 def upsert_user(user_id: int, full_name: str | None, username: str | None):
     """
     Сохраняем данные пользователя, чтобы потом показывать имена в лидерборде.
+    Пишем в хранилище только если имя изменилось; иначе лишь запоминаем
+    время визита — его сбрасывает на диск flush_last_seen раз в несколько минут.
     """
     uid = str(user_id)
 
     # как показывать пользователя по умолчанию
     display = f"@{username}" if username else (full_name or uid)
+    identity = (display, username or "", full_name or "")
+
+    if _stored_identity(uid) == identity:
+        _pending_seen[uid] = _now_iso()
+        return
+
+    get_store().set_user(uid, {
+        "display": display,
+        "username": identity[1],
+        "full_name": identity[2],
+        "updated_at": _now_iso(),
+    })
+    _identity_cache[uid] = identity
+    _display_cache[uid] = display
+    _pending_seen.pop(uid, None)
+
+def flush_last_seen() -> int:
+    """
+    Записывает накопленные updated_at одной пачкой.
+    Возвращает количество обновлённых пользователей.
+    """
+    global _pending_seen
+    if not _pending_seen:
+        return 0
+    # идёт в фоновом потоке, пока upsert_user в event loop меняет словарь:
+    # забираем его целиком, новые визиты копятся уже в свежем
+    pending, _pending_seen = _pending_seen, {}
+    store = get_store()
+    written = 0
+    with store.batch():
+        for uid, seen_at in list(pending.items()):
+            record = store.get_user(uid)
+            if record is None:
+                continue
+            store.set_user(uid, {**record, "updated_at": seen_at})
+            written += 1
+    return written
+
+def add_points(user_id: int, points: int, source: str = ""):
+    """
+    source — откуда очки ("quiz", "tf", "pvp", ...), попадает в журнал начислений.
+    """
+    apply_points(get_store(), str(user_id), points, source, _today_key())
 
-    def mutator(data: dict) -> None:
-        data["users"][uid] = {
-            "display": display,
-            "username": username or "",
-            "full_name": full_name or "",
-            "updated_at": datetime.now(TZ).isoformat(timespec="seconds"),
-        }
-
-    update_scores(mutator)
-
-def add_points(user_id: int, points: int):
+async def award_points(user_id: int, points: int, source: str = ""):
+    """
+    То же, что add_points, но для хендлеров: через общий async-писатель,
+    без блокировки event loop. Возвращается, когда очки уже на диске.
+    """
     uid = str(user_id)
+    day = _today_key()
+    await scores.call(lambda store: apply_points(store, uid, points, source, day))
 
-    def mutator(data: dict) -> None:
-        # total
-        data["total"][uid] = data["total"].get(uid, 0) + points
+def apply_points(store, uid: str, points: int, source: str, day: str) -> None:
+    """
+    Начисление над уже открытым хранилищем — для транзакций, где вместе
+    с очками меняется что-то ещё (см. services.answers).
+    """
+    # под локом хранилища, чтобы порядок seq в журнале совпадал с порядком применения
+    with store.lock:
+        # сначала событие в журнал, потом total + daily в хранилище
+        seq = get_ledger().append(uid, points, source)
+        store.add_points(uid, day, points, seq=seq)
 
-        # daily
-        day = _today_key()
-        data["daily"].setdefault(day, {})
-        data["daily"][day][uid] = data["daily"][day].get(uid, 0) + points
+def recover_points() -> int:
+    """
+    При старте: доигрываем события журнала, которые не успели попасть в снимок.
+    Возвращает количество применённых событий.
+    """
+    store = get_store()
+    replayed = 0
+    for seq, uid, delta, ts, _source in get_ledger().replay(store.ledger_seq()):
+        store.add_points(uid, _day_key(ts), delta, seq=seq)
+        replayed += 1
+    return replayed
+
+def commit_ledger() -> bool:
+    # журнал ещё не открывали — значит, и сбрасывать нечего
+    if _ledger is None:
+        return False
+    return _ledger.commit()
+
+def close_ledger() -> None:
+    """
+    Сбрасывает хвост журнала и закрывает файл (при остановке бота).
+    """
+    global _ledger
+    if _ledger is not None:
+        _ledger.close()
+        _ledger = None
 
-    update_scores(mutator)
+def compact_ledger() -> bool:
+    """
+    Сворачиваем журнал в снимок: сбрасываем хранилище на диск
+    и убираем уже учтённые события в архивный сегмент.
+    """
+    store = get_store()
+    store.flush()
+    return get_ledger().rotate(store.ledger_seq())
 
-def get_profile(user_id: int):
-    data = load_scores()
-    uid = str(user_id)
+def apply_daily_retention(keep_days: int = DAILY_KEEP_DAYS) -> int:
+    """
+    Переносит дневные корзины старше keep_days в помесячный архив
+    (services.score_archive) и убирает их из хранилища.
+    Возвращает количество перенесённых дней.
+    """
+    cutoff = (datetime.now(TZ) - timedelta(days=max(1, keep_days) - 1)).strftime("%Y-%m-%d")
+    store = get_store()
+    old_days = store.daily_before(cutoff)
+    if not old_days:
+        return 0
+    # сначала архив, потом удаление: если упадём посередине, данные не потеряются
+    archive_days(old_days)
+    store.drop_daily_before(cutoff)
+    return len(old_days)
 
-    total = data["total"].get(uid, 0)
-    day = _today_key()
-    today_points = data["daily"].get(day, {}).get(uid, 0)
-    return total, today_points
+def get_profile(user_id: int):
+    return get_store().get_points(str(user_id), _today_key())
 
 def get_user_display(user_id: int) -> str:
-    data = load_scores()
-    uid = str(user_id)
-    return data["users"].get(uid, {}).get("display", uid)
+    return get_user_displays([user_id])[user_id]
+
+def get_user_displays(user_ids: list[int]) -> dict[int, str]:
+    """
+    Имена для целого лидерборда за один заход в хранилище
+    (или вообще без него, если все имена уже в кэше).
+    """
+    missing = [str(u) for u in user_ids if str(u) not in _display_cache]
+    if missing:
+        users = get_store().get_users(missing)
+        for uid in missing:
+            _display_cache[uid] = users.get(uid, {}).get("display", uid)
+    return {u: _display_cache[str(u)] for u in user_ids}
 
 def get_leaderboard(limit=10):
     """
     Топ по total (всего)
     Возвращает список (user_id, points)
     """
-    data = load_scores()
-    items = [(int(uid), pts) for uid, pts in data["total"].items()]
-    items.sort(key=lambda x: x[1], reverse=True)
-    return items[:limit]
+    return [(int(uid), pts) for uid, pts in get_store().top_total(limit)]
 
 def get_daily_leaderboard(limit=10):
     """
     Топ за сегодня.
     Возвращает (items, day_key)
     """
-    data = load_scores()
     day = _today_key()
-    items = [(int(uid), pts) for uid, pts in data["daily"].get(day, {}).items()]
-    items.sort(key=lambda x: x[1], reverse=True)
-    return items[:limit], day
\ No newline at end of file
+    return [(int(uid), pts) for uid, pts in get_store().top_daily(day, limit)], day
+
+def get_rank(user_id: int, scope: str = "total") -> Optional[tuple[int, int]]:
+    """
+    Место игрока: scope "total" (за всё время) или "daily" (за сегодня).
+    Возвращает (место, всего игроков) или None, если очков в этом зачёте нет.
+    """
+    uid = str(user_id)
+    if scope == "daily":
+        return get_store().rank_daily(_today_key(), uid)
+    if scope == "total":
+        return get_store().rank_total(uid)
+    raise ValueError(f"Неизвестный зачёт: {scope}")
+
+def rank_line(rank: Optional[tuple[int, int]]) -> str:
+    if not rank:
+        return ""
+    position, players = rank
+    return f"📍 Ты на {position}-м месте из {players}"
@@ -0,0 +1,105 @@
+import json
+from typing import Any, Optional
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - необязательная зависимость
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - необязательная зависимость
+    msgpack = None
+
+FORMATS = ("json", "orjson", "msgpack")
+
+
+class JsonSerializer:
+    """
+    Старый формат: читаемый JSON с отступами. Самый медленный и самый большой.
+    """
+
+    name = "json"
+
+    def dumps(self, obj: Any) -> bytes:
+        return json.dumps(obj, ensure_ascii=False, indent=2).encode("utf-8")
+
+    def loads(self, raw: bytes) -> Any:
+        return json.loads(raw)
+
+
+class OrjsonSerializer:
+    """
+    Компактный JSON через orjson: файл остаётся JSON-ом, но пишется в разы быстрее.
+    """
+
+    name = "orjson"
+
+    def dumps(self, obj: Any) -> bytes:
+        return orjson.dumps(obj)
+
+    def loads(self, raw: bytes) -> Any:
+        return orjson.loads(raw)
+
+
+class MsgpackSerializer:
+    name = "msgpack"
+
+    def dumps(self, obj: Any) -> bytes:
+        return msgpack.packb(obj, use_bin_type=True)
+
+    def loads(self, raw: bytes) -> Any:
+        return msgpack.unpackb(raw, raw=False, strict_map_key=False)
+
+
+def available_formats() -> list[str]:
+    formats = ["json"]
+    if orjson is not None:
+        formats.append("orjson")
+    if msgpack is not None:
+        formats.append("msgpack")
+    return formats
+
+
+def get_serializer(name: str = "json"):
+    if name == "json":
+        return JsonSerializer()
+    if name == "orjson":
+        if orjson is None:
+            raise RuntimeError("Формат orjson выбран, но пакет orjson не установлен")
+        return OrjsonSerializer()
+    if name == "msgpack":
+        if msgpack is None:
+            raise RuntimeError("Формат msgpack выбран, но пакет msgpack не установлен")
+        return MsgpackSerializer()
+    raise ValueError(f"Неизвестный формат хранилища: {name}")
+
+
+def detect_format(raw: bytes) -> Optional[str]:
+    """
+    JSON (любой из двух вариантов) начинается с { или [,
+    msgpack-документ — с заголовка словаря (fixmap 0x80–0x8f, map16 0xde, map32 0xdf).
+    Всё остальное (нули после падения, обрывки) — None: формат не распознан.
+    """
+    stripped = raw.lstrip()
+    if not stripped or stripped[:1] in (b"{", b"["):
+        return "json"
+    first = raw[0]
+    if 0x80 <= first <= 0x8F or first in (0xDE, 0xDF):
+        return "msgpack"
+    return None
+
+
+def loads_auto(raw: bytes) -> Any:
+    """
+    Читает файл в любом из поддерживаемых форматов,
+    поэтому старые JSON-файлы продолжают работать после смены формата.
+    """
+    fmt = detect_format(raw)
+    if fmt is None:
+        raise ValueError("Неизвестный формат файла хранилища")
+    if fmt == "msgpack":
+        return get_serializer("msgpack").loads(raw)
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
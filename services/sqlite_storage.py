@@ -0,0 +1,459 @@
+import json
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Iterator, Optional
+
+from services.ranking import DAILY_INDEX_DAYS, RankIndex
+from services.serialization import loads_auto
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    uid TEXT PRIMARY KEY,
+    display TEXT NOT NULL,
+    username TEXT NOT NULL DEFAULT '',
+    full_name TEXT NOT NULL DEFAULT '',
+    updated_at TEXT NOT NULL DEFAULT ''
+);
+CREATE TABLE IF NOT EXISTS total (
+    uid TEXT PRIMARY KEY,
+    points INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS total_points ON total (points DESC);
+CREATE TABLE IF NOT EXISTS daily (
+    day TEXT NOT NULL,
+    uid TEXT NOT NULL,
+    points INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, uid)
+);
+CREATE INDEX IF NOT EXISTS daily_day_points ON daily (day, points DESC);
+CREATE TABLE IF NOT EXISTS sections (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS progress (
+    game TEXT NOT NULL,
+    day TEXT NOT NULL,
+    uid TEXT NOT NULL,
+    seen TEXT,
+    cursor INTEGER,
+    PRIMARY KEY (game, day, uid)
+);
+"""
+
+_TABLES = ("users", "total", "daily", "sections", "progress")
+_CORE_KEYS = ("users", "total", "daily", "progress")
+_USER_FIELDS = ("display", "username", "full_name", "updated_at")
+
+
+class SqliteScoreStore:
+    """
+    Очки в SQLite (WAL): users, total и daily — отдельные таблицы с индексами,
+    прогресс за день — строка на (игра, день, игрок) в progress,
+    остальные разделы документа (meta и т.п.) лежат JSON-ом в sections.
+    Каждая запись трогает одну строку, а не переписывает весь файл.
+    Места в рейтинге считает RankIndex в памяти, как у ScoreStore, — без COUNT по таблице;
+    индексы строятся при первом запросе, их обновляет add_points, а откат
+    транзакции и правки документа целиком (save/update) их сбрасывают.
+    """
+
+    def __init__(self, path: Path, migrate_from: Optional[Path] = None):
+        self.path = path
+        # у SQLite своя долговечность — параметры write-behind ни на что не влияют
+        self.flush_interval = 0.0
+        self.flush_every = 1
+
+        self._lock = threading.RLock()
+        self._total_index: Optional[RankIndex] = None
+        self._daily_index: dict[str, RankIndex] = {}
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+        self._split_progress_section()
+
+        # переносим, пока база пустая: неудачный перенос откатывается целиком
+        # и повторится при следующем запуске
+        if migrate_from is not None and migrate_from.exists() and self.is_empty():
+            try:
+                migrate_json(migrate_from, self)
+            except BaseException:
+                self._db.close()
+                raise
+
+    @property
+    def dirty(self) -> int:
+        return 0
+
+    def is_empty(self) -> bool:
+        with self._lock:
+            return not any(
+                self._db.execute(f"SELECT 1 FROM {table} LIMIT 1").fetchone()
+                for table in _TABLES
+            )
+
+    @property
+    def lock(self) -> threading.RLock:
+        return self._lock
+
+    def _split_progress_section(self) -> None:
+        # раньше прогресс лежал одним JSON-ом в sections — раскладываем по строкам
+        row = self._db.execute("SELECT value FROM sections WHERE key = 'progress'").fetchone()
+        if row is None:
+            return
+        with self.batch():
+            self._db.executemany(
+                "INSERT OR REPLACE INTO progress (game, day, uid, seen, cursor) VALUES (?, ?, ?, ?, ?)",
+                _progress_rows(json.loads(row[0])),
+            )
+            self._db.execute("DELETE FROM sections WHERE key = 'progress'")
+
+    @contextmanager
+    def batch(self) -> Iterator["SqliteScoreStore"]:
+        """
+        Несколько изменений одной транзакцией (один COMMIT).
+        """
+        with self._lock:
+            if self._db.in_transaction:
+                yield self
+                return
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                yield self
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                # индексы уже видели откатанные add_points
+                self._reset_indexes()
+                raise
+            self._db.execute("COMMIT")
+
+    def _reset_indexes(self) -> None:
+        self._total_index = None
+        self._daily_index = {}
+
+    def _total_ranking(self) -> RankIndex:
+        if self._total_index is None:
+            self._total_index = RankIndex(dict(self._db.execute("SELECT uid, points FROM total")))
+        return self._total_index
+
+    def _day_ranking(self, day: str) -> RankIndex:
+        index = self._daily_index.get(day)
+        if index is None:
+            index = RankIndex(dict(self._db.execute("SELECT uid, points FROM daily WHERE day = ?", (day,))))
+            self._daily_index[day] = index
+            # индексы держим только для активных дней
+            for old_day in sorted(self._daily_index)[:-DAILY_INDEX_DAYS]:
+                del self._daily_index[old_day]
+        return index
+
+    def _tx(self, fn: Callable[[sqlite3.Connection], None]) -> None:
+        with self.batch():
+            fn(self._db)
+
+    # --- совместимость с load_scores/save_scores/update_scores ---
+
+    def load(self) -> dict:
+        """
+        Собирает весь документ целиком. Это медленный путь для старого кода,
+        горячие операции идут через точечные методы ниже.
+        """
+        with self._lock:
+            data: dict = {"users": {}, "total": {}, "daily": {}}
+            for uid, display, username, full_name, updated_at in self._db.execute(
+                "SELECT uid, display, username, full_name, updated_at FROM users"
+            ):
+                data["users"][uid] = {
+                    "display": display,
+                    "username": username,
+                    "full_name": full_name,
+                    "updated_at": updated_at,
+                }
+            for uid, points in self._db.execute("SELECT uid, points FROM total"):
+                data["total"][uid] = points
+            for day, uid, points in self._db.execute("SELECT day, uid, points FROM daily"):
+                data["daily"].setdefault(day, {})[uid] = points
+            for key, value in self._db.execute("SELECT key, value FROM sections"):
+                data[key] = json.loads(value)
+            progress = self._progress_document()
+            if progress:
+                data["progress"] = progress
+            return data
+
+    def save(self, data: dict) -> None:
+        with self._lock:
+            self._reset_indexes()
+            self._tx(lambda db: _write_document(db, data))
+
+    def update(self, mutator: Callable[[dict], None]) -> None:
+        with self._lock:
+            data = self.load()
+            mutator(data)
+            self.save(data)
+
+    def flush(self) -> bool:
+        return False
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    # --- точечные операции ---
+
+    def get_user(self, uid: str) -> Optional[dict]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT display, username, full_name, updated_at FROM users WHERE uid = ?", (uid,)
+            ).fetchone()
+        if row is None:
+            return None
+        return dict(zip(_USER_FIELDS, row))
+
+    def get_users(self, uids: list[str]) -> dict[str, dict]:
+        if not uids:
+            return {}
+        placeholders = ", ".join("?" * len(uids))
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT uid, display, username, full_name, updated_at FROM users WHERE uid IN ({placeholders})",
+                list(uids),
+            ).fetchall()
+        return {row[0]: dict(zip(_USER_FIELDS, row[1:])) for row in rows}
+
+    def set_user(self, uid: str, record: dict) -> None:
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO users (uid, display, username, full_name, updated_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (uid, *(record.get(f, "") for f in _USER_FIELDS)),
+            )
+
+    def add_points(self, uid: str, day: str, delta: int, seq: Optional[int] = None) -> None:
+        def apply(db: sqlite3.Connection) -> None:
+            db.execute(
+                "INSERT INTO total (uid, points) VALUES (?, ?) "
+                "ON CONFLICT (uid) DO UPDATE SET points = points + excluded.points",
+                (uid, delta),
+            )
+            db.execute(
+                "INSERT INTO daily (day, uid, points) VALUES (?, ?, ?) "
+                "ON CONFLICT (day, uid) DO UPDATE SET points = points + excluded.points",
+                (day, uid, delta),
+            )
+            if seq is not None:
+                db.execute(
+                    "INSERT OR REPLACE INTO sections (key, value) VALUES ('meta', ?)",
+                    (json.dumps({"ledger_seq": seq}),),
+                )
+            if self._total_index is not None:
+                self._total_index.add(uid, delta)
+            if day in self._daily_index:
+                self._daily_index[day].add(uid, delta)
+
+        self._tx(apply)
+
+    def ledger_seq(self) -> int:
+        with self._lock:
+            row = self._db.execute("SELECT value FROM sections WHERE key = 'meta'").fetchone()
+        return int(json.loads(row[0]).get("ledger_seq", 0)) if row else 0
+
+    def get_points(self, uid: str, day: str) -> tuple[int, int]:
+        with self._lock:
+            total = self._db.execute("SELECT points FROM total WHERE uid = ?", (uid,)).fetchone()
+            today = self._db.execute(
+                "SELECT points FROM daily WHERE day = ? AND uid = ?", (day, uid)
+            ).fetchone()
+        return (total[0] if total else 0), (today[0] if today else 0)
+
+    def top_total(self, limit: int) -> list[tuple[str, int]]:
+        with self._lock:
+            return self._db.execute(
+                "SELECT uid, points FROM total ORDER BY points DESC LIMIT ?", (limit,)
+            ).fetchall()
+
+    def top_daily(self, day: str, limit: int) -> list[tuple[str, int]]:
+        with self._lock:
+            return self._db.execute(
+                "SELECT uid, points FROM daily WHERE day = ? ORDER BY points DESC LIMIT ?", (day, limit)
+            ).fetchall()
+
+    def rank_total(self, uid: str) -> Optional[tuple[int, int]]:
+        with self._lock:
+            index = self._total_ranking()
+            position = index.rank(uid)
+            return (position, len(index)) if position is not None else None
+
+    def rank_daily(self, day: str, uid: str) -> Optional[tuple[int, int]]:
+        with self._lock:
+            index = self._day_ranking(day)
+            position = index.rank(uid)
+            return (position, len(index)) if position is not None else None
+
+    def daily_before(self, cutoff_day: str) -> dict[str, dict]:
+        days: dict[str, dict] = {}
+        with self._lock:
+            for day, uid, points in self._db.execute(
+                "SELECT day, uid, points FROM daily WHERE day < ?", (cutoff_day,)
+            ):
+                days.setdefault(day, {})[uid] = points
+        return days
+
+    def drop_daily_before(self, cutoff_day: str) -> int:
+        with self._lock:
+            dropped = self._db.execute(
+                "SELECT COUNT(DISTINCT day) FROM daily WHERE day < ?", (cutoff_day,)
+            ).fetchone()[0]
+            self._db.execute("DELETE FROM daily WHERE day < ?", (cutoff_day,))
+            for day in [day for day in self._daily_index if day < cutoff_day]:
+                del self._daily_index[day]
+        return dropped
+
+    def get_progress(self, game: str, day: str, uid: str) -> tuple[Any, Optional[int]]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT seen, cursor FROM progress WHERE game = ? AND day = ? AND uid = ?", (game, day, uid)
+            ).fetchone()
+        if row is None:
+            return None, None
+        return _load_seen(row[0]), row[1]
+
+    def set_progress(self, game: str, day: str, uid: str, seen: Any = None, cursor: Optional[int] = None) -> None:
+        if seen is None and cursor is None:
+            return
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO progress (game, day, uid, seen, cursor) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (game, day, uid) DO UPDATE SET "
+                "seen = COALESCE(excluded.seen, seen), cursor = COALESCE(excluded.cursor, cursor)",
+                (game, day, uid, _dump_seen(seen), cursor),
+            )
+
+    def drop_progress_before(self, cutoff: Callable[[str], str]) -> int:
+        removed = 0
+        with self.batch():
+            games = [game for (game,) in self._db.execute("SELECT DISTINCT game FROM progress")]
+            for game in games:
+                before = cutoff(game)
+                removed += self._db.execute(
+                    "SELECT COUNT(DISTINCT day) FROM progress WHERE game = ? AND day < ? AND seen IS NOT NULL",
+                    (game, before),
+                ).fetchone()[0]
+                self._db.execute("DELETE FROM progress WHERE game = ? AND day < ?", (game, before))
+        return removed
+
+    def _progress_document(self) -> dict:
+        with self._lock:
+            rows = self._db.execute("SELECT game, day, uid, seen, cursor FROM progress").fetchall()
+        progress: dict = {}
+        for game, day, uid, seen, cursor in rows:
+            if seen is not None:
+                progress.setdefault(game, {}).setdefault(day, {})[uid] = _load_seen(seen)
+            if cursor is not None:
+                progress.setdefault("decks", {}).setdefault(game, {}).setdefault(day, {})[uid] = cursor
+        return progress
+
+
+def _dump_seen(seen: Any) -> Optional[str]:
+    if seen is None or isinstance(seen, str):
+        return seen
+    # старый формат — список id
+    return json.dumps(seen)
+
+
+def _load_seen(raw: Optional[str]) -> Any:
+    # base64 никогда не начинается со скобки, так что список id не спутать
+    if raw is not None and raw.startswith("["):
+        return json.loads(raw)
+    return raw
+
+
+def _progress_rows(progress: dict) -> list[tuple]:
+    """
+    Раздел progress документа -> строки (game, day, uid, seen, cursor).
+    """
+    rows: dict[tuple[str, str, str], list] = {}
+    for game, by_day in progress.items():
+        if game == "decks":
+            for deck_game, deck_days in by_day.items():
+                for day, bucket in deck_days.items():
+                    for uid, cursor in bucket.items():
+                        rows.setdefault((deck_game, day, uid), [None, None])[1] = int(cursor)
+            continue
+        for day, bucket in by_day.items():
+            for uid, seen in bucket.items():
+                rows.setdefault((game, day, uid), [None, None])[0] = _dump_seen(seen)
+    return [(*key, seen, cursor) for key, (seen, cursor) in rows.items()]
+
+
+def _write_document(db: sqlite3.Connection, data: dict) -> None:
+    db.execute("DELETE FROM users")
+    db.execute("DELETE FROM total")
+    db.execute("DELETE FROM daily")
+    db.execute("DELETE FROM sections")
+    db.execute("DELETE FROM progress")
+    db.executemany(
+        "INSERT INTO users (uid, display, username, full_name, updated_at) VALUES (?, ?, ?, ?, ?)",
+        (
+            (uid, *(str(rec.get(f) or "") for f in _USER_FIELDS))
+            for uid, rec in data.get("users", {}).items()
+        ),
+    )
+    db.executemany(
+        "INSERT INTO total (uid, points) VALUES (?, ?)",
+        ((uid, int(pts)) for uid, pts in data.get("total", {}).items()),
+    )
+    db.executemany(
+        "INSERT INTO daily (day, uid, points) VALUES (?, ?, ?)",
+        (
+            (day, uid, int(pts))
+            for day, bucket in data.get("daily", {}).items()
+            for uid, pts in bucket.items()
+        ),
+    )
+    db.executemany(
+        "INSERT INTO progress (game, day, uid, seen, cursor) VALUES (?, ?, ?, ?, ?)",
+        _progress_rows(data.get("progress", {})),
+    )
+    db.executemany(
+        "INSERT INTO sections (key, value) VALUES (?, ?)",
+        (
+            (key, json.dumps(value, ensure_ascii=False))
+            for key, value in data.items()
+            if key not in _CORE_KEYS
+        ),
+    )
+
+
+def migrate_json(json_path: Path, store: SqliteScoreStore) -> dict:
+    """
+    Разовый перенос scores.json (в любом формате хранилища) в пустую базу SQLite.
+    Возвращает, сколько строк попало в каждую таблицу.
+    """
+    data = loads_auto(json_path.read_bytes())
+    if not isinstance(data, dict):
+        raise ValueError(f"{json_path}: ожидался документ очков, а не {type(data).__name__}")
+    # save() заменяет всё содержимое базы — в живую базу переносить нельзя
+    with store.batch():
+        if not store.is_empty():
+            raise RuntimeError(f"{store.path} уже содержит данные, перенос отменён")
+        store.save(data)
+    return {
+        "users": len(data.get("users", {})),
+        "total": len(data.get("total", {})),
+        "daily": sum(len(b) for b in data.get("daily", {}).values()),
+    }
+
+
+if __name__ == "__main__":
+    # python -m services.sqlite_storage — перенос storage/scores.json в storage/scores.sqlite3
+    from services.storage import SCORES_DB, SCORES_FILE
+
+    store = SqliteScoreStore(SCORES_DB)
+    try:
+        counts = migrate_json(SCORES_FILE, store)
+    except RuntimeError as e:
+        raise SystemExit(str(e))
+    finally:
+        store.close()
+    print(f"Перенесено: {counts}")
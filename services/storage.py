@@ -1,13 +1,28 @@
-import json
+import asyncio
+import logging
 import os
+import pickle
 import threading
+import time
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Callable
+from typing import Any, Callable, Iterator, Optional
 
+from services.ranking import DAILY_INDEX_DAYS, RankIndex
+from services.serialization import get_serializer, loads_auto
+
+log = logging.getLogger(__name__)
 STORAGE_DIR = Path("storage")
 SCORES_FILE = STORAGE_DIR / "scores.json"
+SCORES_DB = STORAGE_DIR / "scores.sqlite3"
+
+BACKENDS = ("json", "sqlite")
 
-_lock = threading.Lock()
+# write-behind: как часто и после скольких изменений сбрасываем хранилище на диск
+FLUSH_INTERVAL_SEC = 5.0
+FLUSH_EVERY = 100
+# async-писатель: сколько ждём, чтобы собрать изменения в одну запись
+BATCH_WINDOW_SEC = 0.005
 
 
 def _default_payload() -> dict:
@@ -17,37 +32,620 @@ def _default_payload() -> dict:
 def ensure_storage() -> None:
     STORAGE_DIR.mkdir(parents=True, exist_ok=True)
     if not SCORES_FILE.exists():
-        _atomic_write(_default_payload())
+        _atomic_write(SCORES_FILE, _default_payload())
+
+
+def _atomic_write(path: Path, data: dict, serializer=None) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    tmp.write_bytes((serializer or get_serializer("json")).dumps(data))
+    os.replace(tmp, path)
+
+
+class JsonNamespace:
+    """
+    Один JSON-файл хранилища (scores, streaks, pvp_stats, ...).
+    Читается один раз и живёт в памяти, на диск его пишет владелец (Storage)
+    вместе с остальными изменёнными файлами.
+    """
+
+    def __init__(self, owner: "Storage", name: str, path: Path):
+        self.owner = owner
+        self.name = name
+        self.path = path
+        self._lock = owner.lock
+        self._data: Optional[dict] = None
+        # номер последнего снятого и последнего записанного снимка (см. Storage.flush)
+        self._generation = 0
+        self._written = 0
+
+    @property
+    def lock(self) -> threading.RLock:
+        return self._lock
+
+    def _default(self) -> dict:
+        return {}
+
+    def _loaded(self) -> dict:
+        if self._data is None:
+            data = None
+            if self.path.exists():
+                raw = self.path.read_bytes()
+                try:
+                    # формат определяем по содержимому: старый JSON читается всегда
+                    data = loads_auto(raw)
+                except Exception as e:
+                    # битый файл, неизвестный формат или нет пакета для формата (msgpack)
+                    log.error("Cannot decode %s: %r", self.path, e)
+                    data = None
+                if not isinstance(data, dict):
+                    self._move_aside()
+            self._data = data if isinstance(data, dict) else self._default()
+        return self._data
+
+    def _move_aside(self) -> None:
+        """
+        Битый файл не перезаписываем: убираем в <name>.<время>.corrupt и начинаем с пустого.
+        """
+        corrupt = self.path.with_name(f"{self.path.name}.{int(time.time())}.corrupt")
+        os.replace(self.path, corrupt)
+        log.error("Storage file %s is unreadable, moved to %s", self.path, corrupt)
+
+    def load(self) -> dict:
+        """
+        Возвращает живой документ (без копии). Менять его нужно через save/update
+        или внутри transaction(), иначе изменения не попадут на диск.
+        """
+        with self._lock:
+            return self._loaded()
+
+    def save(self, data: dict) -> None:
+        with self._lock:
+            self._data = data
+            self._mark_dirty()
+
+    def update(self, mutator: Callable[[dict], Any]) -> Any:
+        with self._lock:
+            result = mutator(self._loaded())
+            self._mark_dirty()
+            return result
+
+    def _mark_dirty(self) -> None:
+        self.owner._mark_dirty(self)
+
+    def _snapshot(self) -> tuple["JsonNamespace", int, bytes]:
+        # под локом только копия документа: pickle — самая быстрая глубокая копия,
+        # сериализация в формат хранилища и запись идут уже без лока
+        self._generation += 1
+        return self, self._generation, pickle.dumps(self._data, pickle.HIGHEST_PROTOCOL)
+
+    def _write_snapshot(self, generation: int, blob: bytes) -> None:
+        # вызывается под Storage._write_lock
+        if generation <= self._written:
+            # более свежий снимок уже записал другой поток
+            return
+        _atomic_write(self.path, pickle.loads(blob), self.owner.serializer)
+        self._written = generation
+
+    @property
+    def dirty(self) -> int:
+        return self.owner.dirty
+
+    @contextmanager
+    def batch(self) -> Iterator["JsonNamespace"]:
+        with self.owner.batch():
+            yield self
+
+    def flush(self) -> bool:
+        return self.owner.flush()
+
+
+class ScoreStore(JsonNamespace):
+    """
+    scores.json: users, total, daily и дополнительные разделы (progress, meta).
+    Для лидербордов рядом с документом держим RankIndex: по total
+    и по нескольким последним дням. Их обновляет add_points, а любые правки
+    документа в обход точечных операций (save/update) просто сбрасывают индексы.
+    """
+
+    def __init__(self, owner: "Storage", name: str, path: Path):
+        super().__init__(owner, name, path)
+        self._total_index: Optional[RankIndex] = None
+        self._daily_index: dict[str, RankIndex] = {}
+
+    def _default(self) -> dict:
+        return _default_payload()
+
+    def _reset_indexes(self) -> None:
+        self._total_index = None
+        self._daily_index = {}
+
+    def save(self, data: dict) -> None:
+        with self._lock:
+            self._reset_indexes()
+            super().save(data)
+
+    def update(self, mutator: Callable[[dict], Any]) -> Any:
+        with self._lock:
+            self._reset_indexes()
+            return super().update(mutator)
+
+    def _total_ranking(self) -> RankIndex:
+        if self._total_index is None:
+            self._total_index = RankIndex(self._loaded()["total"])
+        return self._total_index
+
+    def _day_ranking(self, day: str) -> RankIndex:
+        index = self._daily_index.get(day)
+        if index is None:
+            index = RankIndex(self._loaded()["daily"].get(day, {}))
+            self._daily_index[day] = index
+            # индексы держим только для активных дней
+            for old_day in sorted(self._daily_index)[:-DAILY_INDEX_DAYS]:
+                del self._daily_index[old_day]
+        return index
+
+    def _loaded(self) -> dict:
+        data = super()._loaded()
+        data.setdefault("users", {})
+        data.setdefault("total", {})
+        data.setdefault("daily", {})
+        return data
+
+    # --- точечные операции (тот же набор есть у SqliteScoreStore) ---
+
+    def get_user(self, uid: str) -> Optional[dict]:
+        with self._lock:
+            return self._loaded()["users"].get(uid)
+
+    def get_users(self, uids: list[str]) -> dict[str, dict]:
+        with self._lock:
+            users = self._loaded()["users"]
+            return {uid: users[uid] for uid in uids if uid in users}
+
+    def set_user(self, uid: str, record: dict) -> None:
+        with self._lock:
+            self._loaded()["users"][uid] = record
+            self._mark_dirty()
+
+    def add_points(self, uid: str, day: str, delta: int, seq: Optional[int] = None) -> None:
+        """
+        seq — номер события в журнале очков (services.ledger), если оно оттуда.
+        """
+        with self._lock:
+            data = self._loaded()
+            data["total"][uid] = data["total"].get(uid, 0) + delta
+            bucket = data["daily"].setdefault(day, {})
+            bucket[uid] = bucket.get(uid, 0) + delta
+            if self._total_index is not None:
+                self._total_index.set(uid, data["total"][uid])
+            if day in self._daily_index:
+                self._daily_index[day].set(uid, bucket[uid])
+            if seq is not None:
+                data.setdefault("meta", {})["ledger_seq"] = seq
+            self._mark_dirty()
+
+    def ledger_seq(self) -> int:
+        with self._lock:
+            return int(self._loaded().get("meta", {}).get("ledger_seq", 0))
+
+    def get_points(self, uid: str, day: str) -> tuple[int, int]:
+        with self._lock:
+            data = self._loaded()
+            return data["total"].get(uid, 0), data["daily"].get(day, {}).get(uid, 0)
+
+    def top_total(self, limit: int) -> list[tuple[str, int]]:
+        with self._lock:
+            return self._total_ranking().top(limit)
+
+    def top_daily(self, day: str, limit: int) -> list[tuple[str, int]]:
+        with self._lock:
+            return self._day_ranking(day).top(limit)
+
+    def rank_total(self, uid: str) -> Optional[tuple[int, int]]:
+        """
+        (место, сколько всего игроков) или None, если у игрока нет очков.
+        """
+        with self._lock:
+            index = self._total_ranking()
+            position = index.rank(uid)
+            return (position, len(index)) if position is not None else None
+
+    def rank_daily(self, day: str, uid: str) -> Optional[tuple[int, int]]:
+        with self._lock:
+            index = self._day_ranking(day)
+            position = index.rank(uid)
+            return (position, len(index)) if position is not None else None
+
+    def daily_before(self, cutoff_day: str) -> dict[str, dict]:
+        with self._lock:
+            daily = self._loaded()["daily"]
+            return {day: dict(bucket) for day, bucket in daily.items() if day < cutoff_day}
+
+    def drop_daily_before(self, cutoff_day: str) -> int:
+        with self._lock:
+            daily = self._loaded()["daily"]
+            old = [day for day in daily if day < cutoff_day]
+            for day in old:
+                del daily[day]
+                self._daily_index.pop(day, None)
+            if old:
+                self._mark_dirty()
+            return len(old)
+
+    def get_progress(self, game: str, day: str, uid: str) -> tuple[Any, Optional[int]]:
+        """
+        (отметки «видел», курсор колоды) игрока за день; None — ещё не записано.
+        В документе: progress[game][day][uid] и progress["decks"][game][day][uid].
+        """
+        with self._lock:
+            progress = self._loaded().get("progress", {})
+            seen = progress.get(game, {}).get(day, {}).get(uid)
+            cursor = progress.get("decks", {}).get(game, {}).get(day, {}).get(uid)
+            return seen, cursor
+
+    def set_progress(self, game: str, day: str, uid: str, seen: Any = None, cursor: Optional[int] = None) -> None:
+        """
+        Меняет только переданные поля (None — не трогать).
+        """
+        with self._lock:
+            progress = self._loaded().setdefault("progress", {})
+            if seen is not None:
+                progress.setdefault(game, {}).setdefault(day, {})[uid] = seen
+            if cursor is not None:
+                progress.setdefault("decks", {}).setdefault(game, {}).setdefault(day, {})[uid] = cursor
+            self._mark_dirty()
+
+    def drop_progress_before(self, cutoff: Callable[[str], str]) -> int:
+        """
+        Убирает дни раньше cutoff(game) вместе с курсорами колод.
+        Возвращает количество удалённых дневных корзин отметок.
+        """
+        def drop_old(by_day: dict, before: str) -> int:
+            old = [day for day in by_day if day < before]
+            for day in old:
+                del by_day[day]
+            return len(old)
+
+        with self._lock:
+            removed = 0
+            for game, by_day in self._loaded().get("progress", {}).items():
+                if game == "decks":
+                    for deck_game, deck_days in by_day.items():
+                        drop_old(deck_days, cutoff(deck_game))
+                    continue
+                removed += drop_old(by_day, cutoff(game))
+            # запускается раз в сутки, так что лишняя пометка «изменено» не страшна
+            self._mark_dirty()
+            return removed
+
 
+class Storage:
+    """
+    Всё состояние бота в одном месте: пространства имён (файлы в STORAGE_DIR)
+    под общим локом. Изменения копятся в памяти, на диск их пишет фоновая задача
+    (services.maintenance): раз в flush_interval или раньше, как только набралось
+    flush_every изменений (flush_due). Сами изменения на диск не пишут никогда:
+    долговечность очков до снимка держит журнал (services.ledger).
+    Под локом снимается только копия изменённых документов, запись идёт после него.
+    transaction() меняет несколько пространств сразу, атомарно для остального кода.
+    """
 
-def _read_scores_unlocked() -> dict:
-    ensure_storage()
-    data = json.loads(SCORES_FILE.read_text(encoding="utf-8"))
-    data.setdefault("users", {})
-    data.setdefault("total", {})
-    data.setdefault("daily", {})
-    return data
+    def __init__(
+        self,
+        directory: Path = STORAGE_DIR,
+        backend: str = "json",
+        flush_interval: float = FLUSH_INTERVAL_SEC,
+        flush_every: int = FLUSH_EVERY,
+        storage_format: str = "json",
+    ):
+        if backend not in BACKENDS:
+            raise ValueError(f"Неизвестный backend хранилища: {backend}")
+        self.directory = directory
+        # формат, в котором пишем файлы; читаем любой (см. services.serialization)
+        self.serializer = get_serializer(storage_format)
+        self.flush_interval = flush_interval
+        self.flush_every = flush_every
 
+        self.lock = threading.RLock()
+        # снимки пишутся по одному: порядок записи совпадает с порядком снимков
+        self._write_lock = threading.Lock()
+        self._namespaces: dict[str, JsonNamespace] = {}
+        self._dirty = 0
+        self._dirty_namespaces: dict[str, JsonNamespace] = {}
+        self._flush_hooks: list[Callable[[], None]] = []
 
-def _atomic_write(data: dict) -> None:
-    tmp = SCORES_FILE.with_suffix(".tmp")
-    tmp.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
-    os.replace(tmp, SCORES_FILE)
+        if backend == "sqlite":
+            from services.sqlite_storage import SqliteScoreStore
+
+            self.scores = SqliteScoreStore(directory / "scores.sqlite3", migrate_from=directory / "scores.json")
+        else:
+            self.scores = ScoreStore(self, "scores", directory / "scores.json")
+
+    @property
+    def dirty(self) -> int:
+        return self._dirty
+
+    @property
+    def flush_due(self) -> bool:
+        """
+        Набралось flush_every изменений — фоновой задаче пора писать, не дожидаясь интервала.
+        """
+        return self._dirty >= self.flush_every
+
+    def namespace(self, name: str):
+        """
+        "scores" — хранилище очков, остальное — JSON-файл <name>.json.
+        """
+        if name == "scores":
+            return self.scores
+        with self.lock:
+            ns = self._namespaces.get(name)
+            if ns is None:
+                ns = JsonNamespace(self, name, self.directory / f"{name}.json")
+                self._namespaces[name] = ns
+            return ns
+
+    def _mark_dirty(self, ns: JsonNamespace) -> None:
+        self._dirty += 1
+        self._dirty_namespaces[ns.name] = ns
+
+    def add_flush_hook(self, hook: Callable[[], None]) -> None:
+        """
+        hook() вызывается под локом перед каждой записью на диск.
+        Так состояние, которое живёт только в памяти (см. services.streaks),
+        переносится в свои пространства и уезжает на диск вместе с остальными.
+        """
+        with self.lock:
+            self._flush_hooks.append(hook)
+
+    def _run_flush_hooks(self) -> None:
+        # изменения из хуков только копятся: запись делает тот, кто хуки позвал
+        for hook in self._flush_hooks:
+            hook()
+
+    def _take_snapshot(self) -> list[tuple[JsonNamespace, int, bytes]]:
+        # под локом: хуки и копии изменённых документов
+        self._run_flush_hooks()
+        snapshot = [ns._snapshot() for ns in self._dirty_namespaces.values() if ns._data is not None]
+        self._dirty = 0
+        self._dirty_namespaces = {}
+        return snapshot
+
+    def _write_snapshot(self, snapshot: list[tuple[JsonNamespace, int, bytes]]) -> None:
+        written = 0
+        try:
+            with self._write_lock:
+                for ns, generation, blob in snapshot:
+                    ns._write_snapshot(generation, blob)
+                    written += 1
+        except BaseException:
+            # не записалось — эти пространства снова ждут следующей записи
+            with self.lock:
+                for ns, _, _ in snapshot[written:]:
+                    self._dirty_namespaces.setdefault(ns.name, ns)
+                    self._dirty += 1
+            raise
+
+    def flush(self) -> bool:
+        """
+        Сбрасывает все накопленные изменения на диск.
+        Возвращает True, если что-то было записано.
+        """
+        with self.lock:
+            self._run_flush_hooks()
+            if not self._dirty:
+                return False
+            snapshot = self._take_snapshot()
+        self._write_snapshot(snapshot)
+        return True
+
+    @contextmanager
+    def batch(self) -> Iterator["Storage"]:
+        """
+        Несколько изменений под одним локом (для SQLite — одна транзакция).
+        Файлы в конце не пишутся: это дело фоновой записи (см. flush_due).
+        """
+        with self.lock:
+            if isinstance(self.scores, JsonNamespace):
+                yield self
+            else:
+                with self.scores.batch():
+                    yield self
+
+    @contextmanager
+    def transaction(self, *names: str) -> Iterator[tuple]:
+        """
+        with storage.transaction("scores", "streaks") as (scores, streaks): ...
+
+        Для "scores" отдаётся хранилище очков (с его операциями),
+        для остальных — живой dict пространства. Все они считаются изменёнными
+        и уходят на диск вместе, следующей записью.
+        """
+        with self.lock:
+            participants = [self.namespace(name) for name in names]
+            files = [p for p in participants if isinstance(p, JsonNamespace)]
+            try:
+                yield tuple(p if p is self.scores else p._loaded() for p in participants)
+            finally:
+                # отката нет: что успели поменять в памяти, то и запишем
+                for p in files[1:]:
+                    self._dirty_namespaces[p.name] = p
+                if files:
+                    # одна транзакция = одно изменение для политики write-behind
+                    self._mark_dirty(files[0])
+
+    def close(self) -> None:
+        self.flush()
+        close = getattr(self.scores, "close", None)
+        if close is not None:
+            close()
+
+
+_storage: Optional[Storage] = None
+_storage_lock = threading.Lock()
+
+
+def get_storage() -> Storage:
+    global _storage
+    with _storage_lock:
+        if _storage is None:
+            _storage = Storage(STORAGE_DIR)
+        return _storage
+
+
+def get_store():
+    """
+    Хранилище очков (ScoreStore или SqliteScoreStore).
+    """
+    return get_storage().scores
+
+
+def namespace(name: str):
+    return get_storage().namespace(name)
+
+
+def transaction(*names: str):
+    return get_storage().transaction(*names)
+
+
+def configure_store(
+    flush_interval: Optional[float] = None,
+    flush_every: Optional[int] = None,
+    backend: Optional[str] = None,
+    storage_format: Optional[str] = None,
+):
+    """
+    Настраивает хранилище. backend для очков: "json" (по умолчанию) или "sqlite";
+    storage_format для файлов: "json", "orjson" или "msgpack".
+    """
+    global _storage
+    if backend is not None:
+        storage = Storage(STORAGE_DIR, backend=backend)
+        with _storage_lock:
+            if _storage is not None:
+                _storage.close()
+            _storage = storage
+
+    storage = get_storage()
+    if storage_format is not None:
+        storage.serializer = get_serializer(storage_format)
+    if flush_interval is not None:
+        storage.flush_interval = float(flush_interval)
+    if flush_every is not None:
+        storage.flush_every = max(1, int(flush_every))
+    return storage.scores
 
 
 def load_scores() -> dict:
-    with _lock:
-        return _read_scores_unlocked()
+    return get_store().load()
 
 
 def save_scores(data: dict) -> None:
-    with _lock:
-        ensure_storage()
-        _atomic_write(data)
+    get_store().save(data)
 
 
 def update_scores(mutator: Callable[[dict], None]) -> None:
-    with _lock:
-        data = _read_scores_unlocked()
-        mutator(data)
-        _atomic_write(data)
+    get_store().update(mutator)
+
+
+def flush_scores() -> bool:
+    """
+    Сбрасывает на диск всё хранилище (не только scores.json).
+    """
+    return get_storage().flush()
+
+
+class ScoreWriter:
+    """
+    Единственный писатель для async-хендлеров: `await scores.update(mutator)`.
+    fn в call() получает хранилище очков, а внутри может открыть transaction()
+    по другим пространствам. Всё, что пришло за BATCH_WINDOW_SEC, применяется
+    одной пачкой, и вызывающие получают результат, когда журнал очков
+    сброшен на диск (один fsync на пачку). Файлы хранилища пачка не переписывает —
+    их пишет фоновая задача. Всё это идёт в отдельном потоке, event loop не блокируется.
+    """
+
+    def __init__(self, window: float = BATCH_WINDOW_SEC):
+        self.window = window
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def _ensure_started(self) -> asyncio.Queue:
+        if self._task is None or self._task.done():
+            self._queue = asyncio.Queue()
+            self._task = asyncio.create_task(self._run())
+        return self._queue
+
+    async def call(self, fn: Callable[[Any], Any]) -> Any:
+        """
+        fn(store) выполняется внутри общей пачки; возвращает то, что вернула fn.
+        """
+        fut = asyncio.get_running_loop().create_future()
+        self._ensure_started().put_nowait((fn, fut))
+        return await fut
+
+    async def update(self, mutator: Callable[[dict], None]) -> None:
+        await self.call(lambda store: store.update(mutator))
+
+    async def _run(self) -> None:
+        queue = self._queue
+        while True:
+            batch = [await queue.get()]
+            await asyncio.sleep(self.window)
+            while not queue.empty():
+                batch.append(queue.get_nowait())
+
+            try:
+                results = await asyncio.to_thread(_apply_batch, [fn for fn, _ in batch])
+            except Exception as e:
+                # упала сама пачка (например, не открылась транзакция SQLite) — сообщаем всем
+                results = [(False, e)] * len(batch)
+
+            for (_, fut), (ok, value) in zip(batch, results):
+                if fut.done():
+                    continue
+                if ok:
+                    fut.set_result(value)
+                else:
+                    fut.set_exception(value)
+
+    async def close(self) -> None:
+        """
+        Дожидается уже поставленных в очередь изменений и останавливает писателя.
+        """
+        if self._task is None:
+            return
+        # пустая операция встаёт в конец очереди: когда она выполнена, выполнено и всё до неё
+        await self.call(lambda store: None)
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+
+def _apply_batch(fns: list[Callable[[Any], Any]]) -> list[tuple[bool, Any]]:
+    results = []
+    storage = get_storage()
+    with storage.batch():
+        for fn in fns:
+            try:
+                results.append((True, fn(storage.scores)))
+            except Exception as e:
+                results.append((False, e))
+
+    # изменения уже в памяти, события — в буфере журнала: отвечаем, когда журнал на диске
+    try:
+        _commit_ledger()
+    except Exception as e:
+        results = [(ok, value) if not ok else (False, e) for ok, value in results]
+    return results
+
+
+def _commit_ledger() -> None:
+    # services.scoring сам импортирует storage, поэтому берём журнал при вызове
+    from services.scoring import commit_ledger
+
+    commit_ledger()
+
+
+scores = ScoreWriter()
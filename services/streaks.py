@@ -1,56 +1,160 @@
-import json
-import os
-from pathlib import Path
-from datetime import datetime
+import threading
+import time
+from datetime import date, datetime, timedelta
 from zoneinfo import ZoneInfo
-from typing import Dict, Tuple
+from typing import Dict, Optional, Tuple
+
+from services.storage import Storage, get_storage
 
 TZ = ZoneInfo("Europe/Amsterdam")
 
-_STORAGE_DIR = Path(__file__).resolve().parent.parent / "storage"
-_STORAGE_DIR.mkdir(parents=True, exist_ok=True)
+NAMESPACE = "streaks"
+
+# (момент конца текущего дня по time.time(), номер дня) — пересчитываем раз в сутки
+_day_end = 0.0
+_day_ordinal = 0
 
-_PATH = _STORAGE_DIR / "streaks.json"
+
+def _today_ordinal() -> int:
+    global _day_end, _day_ordinal
+    now = time.time()
+    if now >= _day_end:
+        today = datetime.now(TZ)
+        midnight = datetime(today.year, today.month, today.day, tzinfo=TZ)
+        _day_end = (midnight + timedelta(days=1)).timestamp()
+        _day_ordinal = today.toordinal()
+    return _day_ordinal
 
 
 def _today_key() -> str:
-    return datetime.now(TZ).strftime("%Y-%m-%d")
+    return date.fromordinal(_today_ordinal()).isoformat()
+
+
+class StreakRecord:
+    """
+    Серия игрока в одной игре. day — номер дня (date.toordinal),
+    в который серия последний раз менялась.
+    """
+
+    __slots__ = ("streak", "best", "day")
 
+    def __init__(self, streak: int = 0, best: int = 0, day: int = 0):
+        self.streak = streak
+        self.best = best
+        self.day = day
 
-def _load() -> Dict[str, dict]:
-    if not _PATH.exists():
-        return {}
+
+class StreakTable:
+    """
+    Все серии в памяти: uid -> game -> StreakRecord.
+    Ответ игрока — несколько целочисленных операций без ввода-вывода.
+    Изменённые записи переносятся в пространство "streaks" хуком перед
+    каждой записью хранилища и уходят на диск вместе с очками.
+    """
+
+    def __init__(self, storage: Storage):
+        self.storage = storage
+        self._lock = threading.Lock()
+        self._records: dict[str, dict[str, StreakRecord]] = {}
+        self._dirty: set[str] = set()
+
+        for uid, user in storage.namespace(NAMESPACE).load().items():
+            games = self._records[uid] = {}
+            for game, g in (user.get("games") or {}).items():
+                games[game] = StreakRecord(int(g.get("streak", 0)), int(g.get("best", 0)), _parse_day(g.get("day")))
+
+        storage.add_flush_hook(self.sync)
+
+    def update(self, uid: str, game: str, is_correct: bool) -> Tuple[int, int, int]:
+        today = _today_ordinal()
+        with self._lock:
+            games = self._records.get(uid)
+            if games is None:
+                games = self._records[uid] = {}
+            rec = games.get(game)
+            if rec is None:
+                rec = games[game] = StreakRecord(day=today)
+            elif rec.day != today:
+                # новый день — серия начинается заново
+                rec.streak = 0
+                rec.day = today
+
+            if is_correct:
+                rec.streak += 1
+                if rec.streak > rec.best:
+                    rec.best = rec.streak
+                bonus = streak_bonus(rec.streak)
+            else:
+                rec.streak = 0
+                bonus = 0
+
+            self._dirty.add(uid)
+            return rec.streak, rec.best, bonus
+
+    def get(self, uid: str, game: str) -> Optional[Tuple[int, int]]:
+        """
+        (текущая серия, лучшая) или None, если игрок ещё не играл.
+        """
+        with self._lock:
+            rec = self._records.get(uid, {}).get(game)
+            if rec is None:
+                return None
+            return (rec.streak if rec.day == _today_ordinal() else 0), rec.best
+
+    def sync(self) -> None:
+        """
+        Переносит изменённые записи в пространство "streaks" (формат файла прежний).
+        """
+        with self._lock:
+            if not self._dirty:
+                return
+            dirty, self._dirty = self._dirty, set()
+            snapshot = {
+                uid: {
+                    game: (rec.streak, rec.best, rec.day)
+                    for game, rec in self._records[uid].items()
+                }
+                for uid in dirty
+            }
+
+        def mutator(data: Dict[str, dict]) -> None:
+            for uid, games in snapshot.items():
+                data[uid] = {
+                    "games": {
+                        game: {"streak": streak, "best": best, "day": _format_day(day)}
+                        for game, (streak, best, day) in games.items()
+                    }
+                }
+
+        self.storage.namespace(NAMESPACE).update(mutator)
+
+
+def _parse_day(raw) -> int:
     try:
-        with _PATH.open("r", encoding="utf-8") as f:
-            data = json.load(f)
-        return data if isinstance(data, dict) else {}
-    except Exception:
-        return {}
+        return date.fromisoformat(raw).toordinal()
+    except (TypeError, ValueError):
+        return 0
 
 
-def _save(data: Dict[str, dict]) -> None:
-    tmp = _PATH.with_suffix(".tmp")
-    with tmp.open("w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
-    os.replace(tmp, _PATH)
+def _format_day(ordinal: int) -> str:
+    return date.fromordinal(ordinal).isoformat() if ordinal > 0 else ""
 
 
-def _ensure_game(u: dict, game: str) -> None:
-    if "games" not in u:
-        u["games"] = {}
-    if game not in u["games"]:
-        u["games"][game] = {
-            "streak": 0,
-            "best": 0,
-            "day": _today_key()
-        }
+_table: Optional[StreakTable] = None
+_table_lock = threading.Lock()
 
 
-def _reset_if_new_day(u: dict, game: str) -> None:
-    today = _today_key()
-    if u["games"][game].get("day") != today:
-        u["games"][game]["streak"] = 0
-        u["games"][game]["day"] = today
+def get_table() -> StreakTable:
+    global _table
+    storage = get_storage()
+    table = _table
+    if table is not None and table.storage is storage:
+        return table
+    with _table_lock:
+        # хранилище могли пересоздать (configure_store) — тогда читаем серии заново
+        if _table is None or _table.storage is not storage:
+            _table = StreakTable(storage)
+        return _table
 
 
 def streak_bonus(streak: int) -> int:
@@ -74,34 +178,14 @@ def streak_bonus(streak: int) -> int:
 
 def update_streak(user_id: int, game: str, is_correct: bool) -> Tuple[int, int, int]:
     """
-    Обновляет стрик для конкретной игры.
+    Обновляет стрик для конкретной игры (только в памяти, на диск — со следующей записью).
     Возвращает (current_streak, best_streak, bonus_points)
     """
-    data = _load()
-    uid = str(user_id)
-    if uid not in data:
-        data[uid] = {"games": {}}
-
-    _ensure_game(data[uid], game)
-    _reset_if_new_day(data[uid], game)
-
-    g = data[uid]["games"][game]
-
-    if is_correct:
-        g["streak"] = int(g.get("streak", 0)) + 1
-        if g["streak"] > int(g.get("best", 0)):
-            g["best"] = g["streak"]
-        bonus = streak_bonus(g["streak"])
-    else:
-        g["streak"] = 0
-        bonus = 0
-
-    _save(data)
-    return int(g["streak"]), int(g["best"]), int(bonus)
+    return get_table().update(str(user_id), game, is_correct)
 
 
 def streak_line(streak: int) -> str:
     if streak <= 0:
         return ""
     # компактно и понятно
-    return f"🔥 Серия: {streak}"
\ No newline at end of file
+    return f"🔥 Серия: {streak}"
@@ -0,0 +1,62 @@
+import time
+from typing import Callable, Optional
+
+# token bucket: в среднем RATE событий в секунду, подряд — не больше BURST
+RATE_PER_SEC = 4.0
+BURST = 8
+# одинаковый callback (тот же пользователь, та же кнопка) чаще этого — повтор
+DEDUPE_WINDOW_SEC = 1.0
+# раз в столько секунд выкидываем из памяти давно неактивных пользователей
+SWEEP_INTERVAL_SEC = 60.0
+
+
+class FloodGuard:
+    """
+    Решает, пропускать ли событие дальше к хендлерам.
+    Всё в памяти и без ввода-вывода: лишние нажатия отсекаются
+    до того, как хендлер полезет в хранилище.
+    """
+
+    def __init__(
+        self,
+        rate: float = RATE_PER_SEC,
+        burst: int = BURST,
+        dedupe_window: float = DEDUPE_WINDOW_SEC,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.rate = rate
+        self.burst = burst
+        self.dedupe_window = dedupe_window
+        self._clock = clock
+        # user_id -> (токенов осталось, когда считали)
+        self._buckets: dict[int, tuple[float, float]] = {}
+        # (user_id, callback_data) -> когда нажали последний раз
+        self._recent: dict[tuple[int, str], float] = {}
+        self._next_sweep = clock() + SWEEP_INTERVAL_SEC
+
+    def allow(self, user_id: int, callback_data: Optional[str] = None) -> bool:
+        now = self._clock()
+        if now >= self._next_sweep:
+            self._sweep(now)
+
+        if callback_data is not None:
+            key = (user_id, callback_data)
+            last = self._recent.get(key)
+            self._recent[key] = now
+            if last is not None and now - last < self.dedupe_window:
+                return False
+
+        tokens, stamp = self._buckets.get(user_id, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - stamp) * self.rate)
+        if tokens < 1:
+            self._buckets[user_id] = (tokens, now)
+            return False
+        self._buckets[user_id] = (tokens - 1, now)
+        return True
+
+    def _sweep(self, now: float) -> None:
+        # полный бак набирается за burst / rate секунд — такие записи ничего не помнят
+        idle = self.burst / self.rate
+        self._buckets = {uid: b for uid, b in self._buckets.items() if now - b[1] < idle}
+        self._recent = {k: t for k, t in self._recent.items() if now - t < self.dedupe_window}
+        self._next_sweep = now + SWEEP_INTERVAL_SEC
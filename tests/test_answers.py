@@ -0,0 +1,74 @@
+import asyncio
+import importlib
+import os
+import tempfile
+import unittest
+
+
+class RecordAnswerTestCase(unittest.TestCase):
+    def setUp(self):
+        self._cwd = os.getcwd()
+        self._tmp = tempfile.TemporaryDirectory()
+        os.chdir(self._tmp.name)
+
+        import services.storage as storage
+        import services.scoring as scoring
+        import services.progress as progress
+        import services.answers as answers
+
+        self.storage = importlib.reload(storage)
+        self.storage.configure_store(flush_interval=3600, flush_every=1000)
+        self.scoring = importlib.reload(scoring)
+        self.progress = importlib.reload(progress)
+        self.answers = importlib.reload(answers)
+
+        self.writes = 0
+        atomic_write = self.storage._atomic_write
+
+        def counting_write(*args):
+            self.writes += 1
+            atomic_write(*args)
+
+        self.storage._atomic_write = counting_write
+
+    def tearDown(self):
+        self.scoring.get_ledger().close()
+        os.chdir(self._cwd)
+        self._tmp.cleanup()
+
+    def _record(self, qid, is_correct, pts):
+        async def run():
+            result = await self.answers.record_answer(42, "quiz", qid, is_correct, pts)
+            await self.storage.scores.close()
+            return result
+
+        return asyncio.run(run())
+
+    def test_streak_points_and_seen_in_one_commit(self):
+        for qid in (1, 2):
+            self._record(qid, True, 2)
+        self.writes = 0
+
+        result = self._record(3, True, 2)
+
+        self.assertEqual((result.delta, result.bonus, result.streak), (2, 1, 3))
+        self.assertNotIn(result.next_question["id"], {1, 2, 3})
+        self.assertEqual(self.scoring.get_profile(42), (7, 7))
+        self.assertEqual(self.progress.get_seen_today(42, "quiz"), {1, 2, 3})
+        # ответ готов, когда событие в журнале на диске; файлы хранилища он не переписывает
+        self.assertEqual(self.writes, 0)
+        self.assertEqual(len((self.scoring.LEDGER_DIR / "points.jsonl").read_text().splitlines()), 4)
+        # scores.json и streaks.json — потом, одной фоновой записью
+        self.assertTrue(self.storage.flush_scores())
+        self.assertEqual(self.writes, 2)
+
+    def test_wrong_answer_costs_half_and_resets_streak(self):
+        self._record(1, True, 3)
+        result = self._record(2, False, 3)
+
+        self.assertEqual((result.delta, result.bonus, result.streak, result.best_streak), (-2, 0, 0, 1))
+        self.assertEqual(self.scoring.get_profile(42)[0], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
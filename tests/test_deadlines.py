@@ -0,0 +1,53 @@
+import asyncio
+import time
+import unittest
+
+from services.deadlines import DeadlineScheduler
+
+
+class DeadlineSchedulerTestCase(unittest.TestCase):
+    def test_fires_in_order_and_respects_cancel_and_reschedule(self):
+        fired = []
+
+        async def run():
+            async def on_deadline(key):
+                fired.append(key)
+
+            timers = DeadlineScheduler(on_deadline)
+            timers.start()
+            now = time.time()
+            timers.schedule("late", now + 0.06)
+            timers.schedule("cancelled", now + 0.02)
+            timers.schedule("moved", now + 0.01)
+            # более ранний дедлайн после старта должен разбудить задачу
+            timers.schedule("early", now + 0.005)
+            timers.schedule("moved", now + 0.04)
+            timers.cancel("cancelled")
+
+            await asyncio.sleep(0.1)
+            await timers.stop()
+            return len(timers)
+
+        self.assertEqual(asyncio.run(run()), 0)
+        self.assertEqual(fired, ["early", "moved", "late"])
+
+    def test_overdue_deadline_fires_right_away(self):
+        fired = []
+
+        async def run():
+            async def on_deadline(key):
+                fired.append(key)
+
+            timers = DeadlineScheduler(on_deadline)
+            # как после рестарта: дедлайн уже прошёл
+            timers.schedule("m1", time.time() - 30)
+            timers.start()
+            await asyncio.sleep(0.01)
+            await timers.stop()
+
+        asyncio.run(run())
+        self.assertEqual(fired, ["m1"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,32 @@
+import asyncio
+import unittest
+
+from services.fanout import fan_out
+
+
+class FanOutTestCase(unittest.TestCase):
+    def test_runs_concurrently_within_limit_and_isolates_errors(self):
+        in_flight = 0
+        peak = 0
+
+        async def send(uid):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            if uid == 3:
+                raise RuntimeError("blocked by user")
+            return uid * 10
+
+        with self.assertLogs("services.fanout", level="WARNING"):
+            results = asyncio.run(fan_out(range(6), send, limit=4))
+
+        self.assertEqual(peak, 4)
+        self.assertEqual(results[:3], [0, 10, 20])
+        self.assertIsInstance(results[3], RuntimeError)
+        self.assertEqual(results[4:], [40, 50])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+import importlib
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+from services.ledger import PointsLedger
+
+
+class PointsLedgerTestCase(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self._tmp.name)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_append_replay_and_rotate(self):
+        ledger = PointsLedger(self.dir, commit_every=1000, commit_interval=3600)
+        self.assertEqual(ledger.append("1", 5, "quiz", ts=100), 1)
+        self.assertEqual(ledger.append("2", -2, "tf", ts=101), 2)
+
+        self.assertEqual(list(ledger.replay(1)), [[2, "2", -2, 101, "tf"]])
+        self.assertFalse(ledger.rotate(1))
+        self.assertTrue(ledger.rotate(2))
+        ledger.append("1", 3, "pvp", ts=102)
+        ledger.close()
+
+        reopened = PointsLedger(self.dir)
+        self.assertEqual(reopened.last_seq, 3)
+        self.assertEqual([e[0] for e in reopened.replay(0)], [1, 2, 3])
+        self.assertEqual([e[0] for e in reopened.replay(2)], [3])
+        reopened.close()
+
+
+class LedgerRecoveryTestCase(unittest.TestCase):
+    def setUp(self):
+        self._cwd = os.getcwd()
+        self._tmp = tempfile.TemporaryDirectory()
+        os.chdir(self._tmp.name)
+
+    def tearDown(self):
+        os.chdir(self._cwd)
+        self._tmp.cleanup()
+
+    def _reload(self):
+        import services.storage as storage
+        import services.scoring as scoring
+
+        storage = importlib.reload(storage)
+        storage.configure_store(flush_interval=3600, flush_every=1000)
+        return importlib.reload(scoring)
+
+    def test_unflushed_points_are_replayed_from_ledger(self):
+        scoring = self._reload()
+        scoring.add_points(1, 4, source="quiz")
+        scoring.compact_ledger()
+        scoring.add_points(1, 6, source="quiz")
+        scoring.commit_ledger()
+        scoring.get_ledger().close()
+
+        # «падение»: scores.json знает только про первые 4 очка
+        scoring = self._reload()
+        self.assertEqual(scoring.get_profile(1)[0], 4)
+        self.assertEqual(scoring.recover_points(), 1)
+        self.assertEqual(scoring.get_profile(1)[0], 10)
+        self.assertEqual(scoring.recover_points(), 0)
+        scoring.get_ledger().close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,47 @@
+import unittest
+
+from services.matchmaking import MatchmakingQueue
+
+
+class MatchmakingQueueTestCase(unittest.TestCase):
+    def test_pairs_longest_waiting_player_in_band(self):
+        queue = MatchmakingQueue(band=100)
+        self.assertIsNone(queue.join(1, 40, "seat-1"))
+        # повторное нажатие не ставит в очередь второй раз и не даёт пары с самим собой
+        self.assertIsNone(queue.join(1, 40, "seat-1b"))
+        self.assertIsNone(queue.join(2, 540, "seat-2"))
+        self.assertIsNone(queue.join(3, 800, "seat-3"))
+        self.assertEqual(len(queue), 3)
+
+        self.assertEqual(queue.join(4, 10), (1, "seat-1b"))
+        self.assertEqual(queue.join(5, 599), (2, "seat-2"))
+        self.assertEqual(len(queue), 1)
+
+    def test_neighbour_band_is_preferred_over_longer_wait(self):
+        queue = MatchmakingQueue(band=100)
+        self.assertIsNone(queue.join(1, 950, "far"))
+        self.assertIsNone(queue.join(2, 120, "near"))
+        # 1 ждёт дольше, но 2 ближе по очкам
+        self.assertEqual(queue.join(3, 210), (2, "near"))
+
+        self.assertEqual(queue.leave(1), "far")
+        self.assertNotIn(1, queue)
+        self.assertIsNone(queue.leave(1))
+
+    def test_far_players_pair_once_the_oldest_waited_long_enough(self):
+        queue = MatchmakingQueue(band=100, fallback_after=10)
+        self.assertIsNone(queue.join(1, 950, "a", now=0))
+        self.assertIsNone(queue.join(2, 0, "b", now=5))
+        # 1 ждёт уже 10 секунд — пара с ним, хоть он и далеко по очкам
+        self.assertEqual(queue.join(3, 400, "c", now=10), (1, "a"))
+        self.assertEqual(len(queue), 1)
+        self.assertIn(2, queue)
+
+    def test_without_bands_everyone_is_paired(self):
+        queue = MatchmakingQueue(band=0)
+        queue.join(1, 0, "a")
+        self.assertEqual(queue.join(2, 10_000, "b"), (1, "a"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,109 @@
+import importlib
+import os
+import tempfile
+import unittest
+
+from services.progress import Deck, SeenBits
+
+
+class SeenBitsTestCase(unittest.TestCase):
+    def test_encode_decode_roundtrip(self):
+        positions = {qid: i for i, qid in enumerate(range(100, 140))}
+        seen = SeenBits(0, positions)
+        for qid in (100, 107, 139):
+            seen.add(qid)
+
+        restored = SeenBits.decode(seen.encode(), positions)
+        self.assertEqual(set(restored), {100, 107, 139})
+        self.assertIn(107, restored)
+        self.assertNotIn(108, restored)
+        self.assertNotIn(999, restored)
+        self.assertEqual(len(restored), 3)
+        self.assertLessEqual(len(seen.encode()), 8)
+
+    def test_legacy_list_is_accepted(self):
+        positions = {1: 0, 2: 1, 3: 2}
+        self.assertEqual(set(SeenBits.decode([3, 1], positions)), {1, 3})
+        self.assertEqual(len(SeenBits.decode(None, positions)), 0)
+
+
+class DeckTestCase(unittest.TestCase):
+    def test_is_a_seeded_permutation(self):
+        for size in (1, 2, 3, 17, 64, 1000, 5003):
+            deck = Deck(size, "quiz:2024-01-01:5")
+            self.assertEqual(sorted(deck[i] for i in range(size)), list(range(size)))
+
+        a = [Deck(1000, "tf:2024-01-01:1")[i] for i in range(1000)]
+        b = [Deck(1000, "tf:2024-01-01:1")[i] for i in range(1000)]
+        c = [Deck(1000, "tf:2024-01-01:2")[i] for i in range(1000)]
+        self.assertEqual(a, b)
+        self.assertNotEqual(a, c)
+        self.assertNotEqual(a, sorted(a))
+
+
+class SeenTodayTestCase(unittest.TestCase):
+    def setUp(self):
+        self._cwd = os.getcwd()
+        self._tmp = tempfile.TemporaryDirectory()
+        os.chdir(self._tmp.name)
+
+        import services.storage as storage
+        import services.progress as progress
+
+        self.storage = importlib.reload(storage)
+        self.progress = importlib.reload(progress)
+
+    def tearDown(self):
+        os.chdir(self._cwd)
+        self._tmp.cleanup()
+
+    def test_mark_and_count(self):
+        self.progress.mark_seen_today(5, "tf", 2)
+        self.progress.mark_seen_today(5, "tf", 2)
+        self.progress.mark_seen_today(5, "tf", 4)
+
+        self.assertEqual(self.progress.get_seen_today(5, "tf"), {2, 4})
+        self.assertEqual(self.progress.count_seen_today(5, "tf"), 2)
+        self.assertEqual(self.progress.count_seen_today(5, "quiz"), 0)
+
+        raw = self.storage.load_scores()["progress"]["tf"][self.progress.today_key()]["5"]
+        self.assertIsInstance(raw, str)
+
+    def test_deck_walks_whole_bank_without_repeats(self):
+        size = len(self.progress._POSITIONS["tf"])
+        store = self.storage.get_store()
+        served = []
+
+        pos = self.progress.next_position(9, "tf")
+        while pos is not None:
+            served.append(pos)
+            qid = self.progress.TF_BANK.at(pos)["id"]
+            seen = self.progress.mark_seen(store, 9, "tf", qid)
+            pos = self.progress.advance_deck(store, 9, "tf", seen)
+            self.assertEqual(self.progress.questions_left(9, "tf"), size - len(served))
+
+        self.assertEqual(sorted(served), list(range(size)))
+        self.assertIsNone(self.progress.next_position(9, "tf"))
+
+    def test_prune_keeps_only_the_retention_window(self):
+        self.progress.mark_seen_today(5, "tf", 2)
+        self.progress.mark_seen_today(5, "quiz", 1)
+
+        def backdate(data: dict) -> None:
+            progress = data["progress"]
+            progress["tf"]["2000-01-01"] = {"5": "AQ=="}
+            progress["quiz"]["2000-01-01"] = {"5": "AQ=="}
+            progress.setdefault("decks", {}).setdefault("tf", {})["2000-01-01"] = {"5": 3}
+
+        self.storage.update_scores(backdate)
+
+        self.assertEqual(self.progress.prune_progress({"quiz": 100000}), 1)
+        progress = self.storage.load_scores()["progress"]
+        self.assertEqual(list(progress["tf"]), [self.progress.today_key()])
+        self.assertIn("2000-01-01", progress["quiz"])
+        self.assertEqual(progress["decks"]["tf"], {})
+        self.assertEqual(self.progress.get_seen_today(5, "tf"), {2})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+import asyncio
+import importlib
+import json
+import os
+import tempfile
+import unittest
+
+
+class MatchRegistryTestCase(unittest.TestCase):
+    def setUp(self):
+        self._cwd = os.getcwd()
+        self._tmp = tempfile.TemporaryDirectory()
+        os.chdir(self._tmp.name)
+
+        import services.storage as storage
+        import services.pvp_storage as pvp_storage
+
+        self.storage = importlib.reload(storage)
+        self.pvp = importlib.reload(pvp_storage)
+
+    def tearDown(self):
+        self.pvp.get_registry().close()
+        os.chdir(self._cwd)
+        self._tmp.cleanup()
+
+    def _restart(self):
+        # «падение»: реестр и хранилище поднимаются заново с диска
+        self.pvp.get_registry()._fh.close()
+        self.storage = importlib.reload(self.storage)
+        return self.pvp.get_registry()
+
+    def test_journal_survives_restart_without_snapshot(self):
+        async def play():
+            await self.pvp.upsert_match("m1", {"id": "m1", "status": "waiting"})
+            await self.pvp.upsert_match("m2", {"id": "m2", "status": "waiting"})
+            match = await self.pvp.get_match("m1")
+            match["status"] = "active"
+            await self.pvp.upsert_match("m1", match)
+            await self.pvp.delete_match("m2")
+
+        asyncio.run(play())
+        self.assertFalse((self.storage.STORAGE_DIR / "pvp_matches.json").exists())
+
+        registry = self._restart()
+        self.assertEqual(registry.items(), [("m1", {"id": "m1", "status": "active"})])
+
+    def test_snapshot_truncates_journal(self):
+        async def play():
+            await self.pvp.upsert_match("m1", {"id": "m1", "updated_at": 0})
+            self.assertTrue(await self.pvp.snapshot_matches())
+            self.assertFalse(await self.pvp.snapshot_matches())
+            await self.pvp.upsert_match("m2", {"id": "m2", "updated_at": 0})
+
+        asyncio.run(play())
+        journal = self.storage.STORAGE_DIR / self.pvp.JOURNAL_NAME
+        self.assertEqual(len(journal.read_text(encoding="utf-8").splitlines()), 1)
+        snapshot = json.loads((self.storage.STORAGE_DIR / "pvp_matches.json").read_text(encoding="utf-8"))
+        self.assertEqual(list(snapshot), ["m1"])
+
+        registry = self._restart()
+        self.assertEqual(len(registry), 2)
+        self.assertEqual(self.pvp.expire_matches(60), 2)
+
+    def test_expire_looks_only_at_stale_matches(self):
+        registry = self.pvp.get_registry()
+        registry.put("old", {"id": "old", "updated_at": 100})
+        registry.put("revived", {"id": "revived", "updated_at": 100})
+        registry.put("fresh", {"id": "fresh", "updated_at": 1000})
+        registry.put("revived", {"id": "revived", "updated_at": 990})
+
+        self.assertEqual(registry.expire(60, now=1000), 1)
+        self.assertEqual(sorted(mid for mid, _ in registry.items()), ["fresh", "revived"])
+        self.assertEqual(registry.expire(60, now=1000), 0)
+
+    def test_match_lock_serializes_one_match_only(self):
+        events = []
+
+        async def step(match_id, tag):
+            async with self.pvp.match_lock(match_id):
+                events.append(f"{tag}+")
+                await asyncio.sleep(0.01)
+                events.append(f"{tag}-")
+
+        async def run():
+            await asyncio.gather(step("m1", "a"), step("m1", "b"), step("m2", "c"))
+
+        asyncio.run(run())
+        self.assertEqual(events[:2], ["a+", "c+"])
+        self.assertLess(events.index("a-"), events.index("b+"))
+        self.assertEqual(len(self.pvp._match_locks), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
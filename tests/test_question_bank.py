@@ -0,0 +1,38 @@
+import random
+import unittest
+
+from data.question_bank import QuestionBank
+from data.quiz_questions import QUIZ_BANK, QUIZ_QUESTIONS
+
+
+class QuestionBankTestCase(unittest.TestCase):
+    def setUp(self):
+        self.bank = QuestionBank(
+            [
+                {"id": 10, "text": "a", "answer": 1, "points": 2},
+                {"id": 11, "text": "b", "answer": True},
+                {"id": 12, "text": "c", "answer": 0, "points": 2},
+            ],
+            default_points=5,
+        )
+
+    def test_lookup_by_id(self):
+        self.assertEqual(self.bank.at(self.bank.position(11))["text"], "b")
+        self.assertIsNone(self.bank.position(99))
+        self.assertEqual(self.bank.position(12), 2)
+
+    def test_sample_by_difficulty(self):
+        self.assertEqual(self.bank.size_by_difficulty, {2: 2, 5: 1})
+        picked = self.bank.sample(5, difficulty=2, rng=random.Random(1))
+        self.assertEqual(sorted(q["id"] for q in picked), [10, 12])
+        self.assertEqual(self.bank.sample(3, difficulty=4), [])
+
+    def test_real_bank_is_indexed(self):
+        self.assertEqual(len(QUIZ_BANK), len(QUIZ_QUESTIONS))
+        self.assertEqual(sum(QUIZ_BANK.size_by_difficulty.values()), len(QUIZ_QUESTIONS))
+        for q in QUIZ_BANK.sample(5):
+            self.assertIs(QUIZ_BANK.at(QUIZ_BANK.position(q["id"])), q)
+
+
+if __name__ == "__main__":
+    unittest.main()
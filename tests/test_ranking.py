@@ -0,0 +1,41 @@
+import random
+import unittest
+from unittest import mock
+
+import services.ranking as ranking
+from services.ranking import RankIndex
+
+
+class RankIndexTestCase(unittest.TestCase):
+    def _check_against_full_sort(self, rounds: int = 500):
+        rnd = random.Random(7)
+        index = RankIndex({"1": 5, "2": 9})
+        points = {"1": 5, "2": 9}
+        for _ in range(rounds):
+            uid = str(rnd.randint(1, 40))
+            delta = rnd.randint(-5, 10)
+            index.add(uid, delta)
+            points[uid] = points.get(uid, 0) + delta
+
+        expected = sorted(points.items(), key=lambda x: (-x[1], x[0]))[:10]
+        self.assertEqual(index.top(10), expected)
+        self.assertEqual(len(index), len(points))
+        for uid, pts in points.items():
+            self.assertEqual(index.rank(uid), 1 + sum(1 for other in points.values() if other > pts))
+
+    def test_incremental_top_matches_full_sort(self):
+        self._check_against_full_sort()
+
+    def test_bisect_fallback_without_sortedcontainers(self):
+        with mock.patch.object(ranking, "SortedList", None):
+            self._check_against_full_sort()
+            # маленькие корзины — чтобы проверить деление и исчезновение корзин
+            with mock.patch.object(ranking, "_LOAD", 2):
+                self._check_against_full_sort(rounds=2000)
+
+    def test_top_is_empty_for_empty_index(self):
+        self.assertEqual(RankIndex().top(10), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
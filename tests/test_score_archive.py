@@ -0,0 +1,47 @@
+import importlib
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+
+class DailyRetentionTestCase(unittest.TestCase):
+    def setUp(self):
+        self._cwd = os.getcwd()
+        self._tmp = tempfile.TemporaryDirectory()
+        os.chdir(self._tmp.name)
+
+        import services.storage as storage
+        import services.score_archive as score_archive
+        import services.scoring as scoring
+
+        self.storage = importlib.reload(storage)
+        self.archive = importlib.reload(score_archive)
+        self.scoring = importlib.reload(scoring)
+
+    def tearDown(self):
+        os.chdir(self._cwd)
+        self._tmp.cleanup()
+
+    def test_old_days_move_to_monthly_archive(self):
+        today = datetime.now(self.scoring.TZ)
+        old_day = (today - timedelta(days=40)).strftime("%Y-%m-%d")
+        recent_day = (today - timedelta(days=1)).strftime("%Y-%m-%d")
+
+        def mutator(data: dict) -> None:
+            data["daily"][old_day] = {"1": 5, "2": 3}
+            data["daily"][recent_day] = {"1": 1}
+
+        self.storage.update_scores(mutator)
+
+        self.assertEqual(self.scoring.apply_daily_retention(keep_days=7), 1)
+        self.assertEqual(set(self.storage.load_scores()["daily"]), {recent_day})
+
+        self.assertEqual(self.archive.load_month(old_day[:7]), {old_day: {"1": 5, "2": 3}})
+        self.assertEqual(self.archive.user_history(2), [(old_day, 3)])
+        self.assertEqual(self.archive.period_leaderboard(limit=1), [(1, 5)])
+        self.assertEqual(self.scoring.apply_daily_retention(keep_days=7), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
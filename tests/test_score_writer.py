@@ -0,0 +1,68 @@
+import asyncio
+import importlib
+import os
+import tempfile
+import unittest
+
+
+class ScoreWriterTestCase(unittest.TestCase):
+    def setUp(self):
+        self._cwd = os.getcwd()
+        self._tmp = tempfile.TemporaryDirectory()
+        os.chdir(self._tmp.name)
+
+        import services.storage as storage
+
+        self.storage = importlib.reload(storage)
+        self.storage.configure_store(flush_interval=3600, flush_every=1000)
+
+        self.writes = 0
+        atomic_write = self.storage._atomic_write
+
+        def counting_write(*args):
+            self.writes += 1
+            atomic_write(*args)
+
+        self.storage._atomic_write = counting_write
+
+    def tearDown(self):
+        os.chdir(self._cwd)
+        self._tmp.cleanup()
+
+    def test_burst_of_updates_is_one_deferred_write(self):
+        def bump(uid):
+            return lambda data: data["total"].__setitem__(str(uid), uid)
+
+        async def burst():
+            await asyncio.gather(*(self.storage.scores.update(bump(uid)) for uid in range(30)))
+            await self.storage.scores.close()
+
+        asyncio.run(burst())
+
+        # пачка файлы не переписывает — это делает фоновая запись, один раз на всех
+        self.assertEqual(self.writes, 0)
+        self.assertEqual(len(self.storage.load_scores()["total"]), 30)
+        self.assertTrue(self.storage.flush_scores())
+        self.assertEqual(self.writes, 1)
+        self.assertTrue(self.storage.SCORES_FILE.exists())
+
+    def test_failing_mutator_only_fails_its_caller(self):
+        def broken(data):
+            raise KeyError("boom")
+
+        async def run():
+            results = await asyncio.gather(
+                self.storage.scores.update(broken),
+                self.storage.scores.call(lambda store: store.get_points("1", "d")),
+                return_exceptions=True,
+            )
+            await self.storage.scores.close()
+            return results
+
+        failed, ok = asyncio.run(run())
+        self.assertIsInstance(failed, KeyError)
+        self.assertEqual(ok, (0, 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -17,6 +17,7 @@ class ScoringStorageTestCase(unittest.TestCase):
         self.scoring = importlib.reload(scoring)
 
     def tearDown(self):
+        self.scoring.close_ledger()
         os.chdir(self._cwd)
         self._tmp.cleanup()
 
@@ -31,6 +32,17 @@ class ScoringStorageTestCase(unittest.TestCase):
         self.assertEqual(today, 12)
         self.assertEqual(self.scoring.get_user_display(uid), "@alice")
 
+    def test_close_ledger_commits_and_closes_the_file(self):
+        self.scoring.add_points(1, 4)
+        ledger = self.scoring.get_ledger()
+
+        self.scoring.close_ledger()
+        self.assertTrue(ledger._fh.closed)
+        self.assertIsNone(self.scoring._ledger)
+        # повторная остановка ничего не ломает
+        self.scoring.close_ledger()
+        self.assertEqual(self.scoring.recover_points(), 0)
+
     def test_leaderboard_sorted(self):
         self.scoring.add_points(1, 2)
         self.scoring.add_points(2, 10)
@@ -39,6 +51,43 @@ class ScoringStorageTestCase(unittest.TestCase):
         board = self.scoring.get_leaderboard(limit=3)
         self.assertEqual(board, [(2, 10), (3, 5), (1, 2)])
 
+    def test_bulk_displays_follow_upserts(self):
+        self.scoring.upsert_user(1, "Alice", "alice")
+        self.assertEqual(self.scoring.get_user_displays([1, 2]), {1: "@alice", 2: "2"})
+
+        self.scoring.upsert_user(1, "Alice", None)
+        self.scoring.upsert_user(2, "Bob", "bob")
+        self.assertEqual(self.scoring.get_user_displays([2, 1]), {2: "@bob", 1: "Alice"})
+
+    def test_repeat_upsert_does_not_touch_storage(self):
+        store = self.storage.get_store()
+        self.scoring.upsert_user(1, "Alice", "alice")
+        store.flush()
+        first_seen = store.get_user("1")["updated_at"]
+
+        self.scoring.upsert_user(1, "Alice", "alice")
+        self.assertEqual(store.dirty, 0)
+
+        self.scoring.upsert_user(1, "Alice B", "alice")
+        self.assertEqual(store.get_user("1")["full_name"], "Alice B")
+        self.assertGreater(store.dirty, 0)
+
+        store.flush()
+        self.scoring.upsert_user(1, "Alice B", "alice")
+        self.scoring._pending_seen["1"] = "2999-01-01T00:00:00+01:00"
+        self.assertEqual(self.scoring.flush_last_seen(), 1)
+        self.assertNotEqual(store.get_user("1")["updated_at"], first_seen)
+        self.assertEqual(self.scoring.flush_last_seen(), 0)
+
+    def test_rank_shares_place_on_ties(self):
+        self.scoring.add_points(1, 2)
+        self.scoring.add_points(2, 10)
+        self.scoring.add_points(3, 10)
+
+        self.assertEqual(self.scoring.get_rank(1, "total"), (3, 3))
+        self.assertEqual(self.scoring.get_rank(3, "daily"), (1, 3))
+        self.assertIsNone(self.scoring.get_rank(404, "total"))
+
 
 if __name__ == "__main__":
     unittest.main()
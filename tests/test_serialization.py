@@ -0,0 +1,83 @@
+import json
+import random
+import time
+import unittest
+
+from services.serialization import available_formats, detect_format, get_serializer, loads_auto
+
+
+def synthetic_scores(users: int = 50_000, days: int = 7, seed: int = 1) -> dict:
+    rnd = random.Random(seed)
+    data = {"users": {}, "total": {}, "daily": {}}
+    for i in range(users):
+        uid = str(100_000_000 + i)
+        data["users"][uid] = {
+            "display": f"@player_{i}",
+            "username": f"player_{i}",
+            "full_name": f"Игрок {i}",
+            "updated_at": "2024-01-01T12:00:00+01:00",
+        }
+        data["total"][uid] = rnd.randint(-20, 500)
+    uids = list(data["total"])
+    for d in range(days):
+        day = f"2024-01-{d + 1:02d}"
+        data["daily"][day] = {uid: rnd.randint(-5, 40) for uid in rnd.sample(uids, users // 3)}
+    return data
+
+
+class SerializationTestCase(unittest.TestCase):
+    def test_legacy_json_is_detected_and_readable(self):
+        raw = json.dumps({"users": {"1": {"display": "Аня"}}}, ensure_ascii=False, indent=2).encode("utf-8")
+        self.assertEqual(detect_format(raw), "json")
+        self.assertEqual(loads_auto(raw), {"users": {"1": {"display": "Аня"}}})
+
+    def test_every_available_format_roundtrips_through_autodetect(self):
+        doc = {"total": {"1": 5}, "daily": {"2024-01-01": {"1": -2}}, "users": {"1": {"display": "Ёж"}}}
+        for name in available_formats():
+            with self.subTest(fmt=name):
+                self.assertEqual(loads_auto(get_serializer(name).dumps(doc)), doc)
+
+    def test_garbage_is_not_mistaken_for_msgpack(self):
+        for raw in (b"\x00" * 64, b"\xff\x13garbage", b"hello"):
+            with self.subTest(raw=raw):
+                self.assertIsNone(detect_format(raw))
+                with self.assertRaises(ValueError):
+                    loads_auto(raw)
+        self.assertEqual(detect_format(b"\x81\xa1a\x01"), "msgpack")
+
+    def test_unknown_format_is_rejected(self):
+        with self.assertRaises(ValueError):
+            get_serializer("yaml")
+
+
+class SerializationBenchmark(unittest.TestCase):
+    """
+    Время кодирования/декодирования и размер синтетического scores.json на 50k игроков.
+    """
+
+    def test_benchmark_50k_users(self):
+        doc = synthetic_scores()
+        rows = []
+        for name in available_formats():
+            serializer = get_serializer(name)
+
+            t0 = time.perf_counter()
+            raw = serializer.dumps(doc)
+            t1 = time.perf_counter()
+            decoded = serializer.loads(raw)
+            t2 = time.perf_counter()
+
+            self.assertEqual(decoded, doc)
+            rows.append((name, t1 - t0, t2 - t1, len(raw)))
+
+        print()
+        for name, enc, dec, size in rows:
+            print(f"{name:>8}: encode {enc * 1000:8.1f} ms  decode {dec * 1000:8.1f} ms  {size / 1024:9.1f} KiB")
+
+        sizes = {name: size for name, _, _, size in rows}
+        for name, size in sizes.items():
+            self.assertLessEqual(size, sizes["json"], name)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,125 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from services.sqlite_storage import SqliteScoreStore, migrate_json
+
+
+class SqliteScoreStoreTestCase(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self._tmp.name)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_migrates_existing_scores_json(self):
+        legacy = {
+            "users": {"1": {"display": "@a", "username": "a", "full_name": "A", "updated_at": "x"}},
+            "total": {"1": 10, "2": 4},
+            "daily": {"2024-01-01": {"1": 3}, "2024-01-02": {"2": 4}},
+            "progress": {"quiz": {"2024-01-02": {"2": [5]}}},
+        }
+        json_path = self.dir / "scores.json"
+        json_path.write_text(json.dumps(legacy), encoding="utf-8")
+
+        store = SqliteScoreStore(self.dir / "scores.sqlite3", migrate_from=json_path)
+        try:
+            self.assertEqual(store.load(), legacy)
+            self.assertEqual(store.get_user("1")["display"], "@a")
+            self.assertEqual(store.get_progress("quiz", "2024-01-02", "2"), ([5], None))
+        finally:
+            store.close()
+
+    def test_failed_migration_is_retried_and_live_db_is_never_overwritten(self):
+        json_path = self.dir / "scores.json"
+        json_path.write_text(json.dumps({"users": {}, "total": {"1": None}, "daily": {}}), encoding="utf-8")
+        with self.assertRaises(TypeError):
+            SqliteScoreStore(self.dir / "scores.sqlite3", migrate_from=json_path)
+
+        json_path.write_text(json.dumps({"users": {}, "total": {"1": 500}, "daily": {}}), encoding="utf-8")
+        store = SqliteScoreStore(self.dir / "scores.sqlite3", migrate_from=json_path)
+        try:
+            self.assertEqual(store.get_points("1", "d1"), (500, 0))
+            store.add_points("1", "d1", 3)
+            with self.assertRaises(RuntimeError):
+                migrate_json(json_path, store)
+            self.assertEqual(store.get_points("1", "d1"), (503, 3))
+        finally:
+            store.close()
+
+    def test_progress_is_one_row_per_player_and_day(self):
+        path = self.dir / "scores.sqlite3"
+        store = SqliteScoreStore(path)
+        try:
+            # база из прошлой версии: прогресс одним JSON-ом в sections
+            store._db.execute(
+                "INSERT INTO sections (key, value) VALUES ('progress', ?)",
+                (json.dumps({"tf": {"d0": {"1": "AQ=="}}, "decks": {"tf": {"d0": {"1": 2}}}}),),
+            )
+        finally:
+            store.close()
+
+        store = SqliteScoreStore(path)
+        try:
+            self.assertEqual(store.get_progress("tf", "d0", "1"), ("AQ==", 2))
+            # старая JSON-строка прогресса из sections убрана
+            self.assertEqual(store._db.execute("SELECT key FROM sections").fetchall(), [])
+
+            store.set_progress("tf", "d1", "1", seen="Aw==")
+            store.set_progress("tf", "d1", "1", cursor=4)
+            store.set_progress("quiz", "d1", "2", seen=[5])
+            self.assertEqual(store.get_progress("tf", "d1", "1"), ("Aw==", 4))
+            self.assertEqual(store.get_progress("quiz", "d1", "2"), ([5], None))
+            self.assertEqual(store.get_progress("quiz", "d1", "404"), (None, None))
+
+            self.assertEqual(store.drop_progress_before(lambda game: "d1"), 1)
+            self.assertEqual(
+                store.load()["progress"],
+                {"tf": {"d1": {"1": "Aw=="}}, "quiz": {"d1": {"2": [5]}}, "decks": {"tf": {"d1": {"1": 4}}}},
+            )
+        finally:
+            store.close()
+
+    def test_row_level_points_and_tops(self):
+        store = SqliteScoreStore(self.dir / "scores.sqlite3")
+        try:
+            store.add_points("1", "d1", 2)
+            store.add_points("2", "d1", 10)
+            store.add_points("1", "d2", 5)
+
+            self.assertEqual(store.get_points("1", "d2"), (7, 5))
+            self.assertEqual(store.top_total(2), [("2", 10), ("1", 7)])
+            self.assertEqual(store.top_daily("d1", 5), [("2", 10), ("1", 2)])
+            self.assertIsNone(store.get_user("404"))
+            self.assertEqual(store.rank_total("1"), (2, 2))
+            self.assertEqual(store.rank_daily("d2", "1"), (1, 1))
+            self.assertIsNone(store.rank_daily("d2", "2"))
+        finally:
+            store.close()
+
+    def test_rank_index_follows_points_and_rollbacks(self):
+        store = SqliteScoreStore(self.dir / "scores.sqlite3")
+        try:
+            store.add_points("1", "d1", 5)
+            store.add_points("2", "d1", 3)
+            self.assertEqual(store.rank_total("2"), (2, 2))
+
+            store.add_points("2", "d1", 4)
+            store.add_points("3", "d1", 1)
+            self.assertEqual(store.rank_total("2"), (1, 3))
+            self.assertEqual(store.rank_daily("d1", "1"), (2, 3))
+
+            with self.assertRaises(RuntimeError):
+                with store.batch():
+                    store.add_points("3", "d1", 100)
+                    raise RuntimeError("boom")
+            self.assertEqual(store.rank_total("3"), (3, 3))
+            self.assertEqual(store.rank_daily("d1", "3"), (3, 3))
+        finally:
+            store.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,124 @@
+import importlib
+import json
+import os
+import tempfile
+import threading
+import unittest
+
+
+class ScoreStoreTestCase(unittest.TestCase):
+    def setUp(self):
+        self._cwd = os.getcwd()
+        self._tmp = tempfile.TemporaryDirectory()
+        os.chdir(self._tmp.name)
+
+        import services.storage as storage
+
+        self.storage = importlib.reload(storage)
+
+    def tearDown(self):
+        os.chdir(self._cwd)
+        self._tmp.cleanup()
+
+    def _on_disk(self) -> dict:
+        return json.loads(self.storage.SCORES_FILE.read_text(encoding="utf-8"))
+
+    def test_updates_are_batched_until_threshold(self):
+        store = self.storage.configure_store(flush_interval=3600, flush_every=3)
+        storage = self.storage.get_storage()
+        store.flush()
+
+        self.storage.update_scores(lambda d: d["total"].__setitem__("1", 1))
+        self.storage.update_scores(lambda d: d["total"].__setitem__("2", 2))
+        self.assertFalse(storage.flush_due)
+        self.assertEqual(store.dirty, 2)
+
+        self.storage.update_scores(lambda d: d["total"].__setitem__("3", 3))
+        # порог набран: пишет фоновая задача, а не тот, кто менял
+        self.assertTrue(storage.flush_due)
+        self.assertFalse(self.storage.SCORES_FILE.exists())
+
+        self.assertTrue(self.storage.flush_scores())
+        self.assertEqual(store.dirty, 0)
+        self.assertEqual(self._on_disk()["total"], {"1": 1, "2": 2, "3": 3})
+
+    def test_flush_persists_and_reload_reads_back(self):
+        self.storage.configure_store(flush_interval=3600, flush_every=1000)
+        self.storage.update_scores(lambda d: d["users"].__setitem__("7", {"display": "x"}))
+
+        self.assertTrue(self.storage.flush_scores())
+        self.assertFalse(self.storage.flush_scores())
+
+        storage = importlib.reload(self.storage)
+        self.assertEqual(storage.load_scores()["users"]["7"], {"display": "x"})
+
+    def test_transaction_spans_namespaces_and_flushes_together(self):
+        self.storage.configure_store(flush_interval=3600, flush_every=1000)
+        storage = self.storage.get_storage()
+
+        with storage.batch():
+            with self.storage.transaction("scores", "streaks") as (scores, streaks):
+                scores.add_points("5", "2024-01-01", 3)
+                streaks["5"] = {"games": {}}
+        self.assertFalse((self.storage.STORAGE_DIR / "streaks.json").exists())
+        self.assertTrue(storage.dirty)
+
+        self.assertTrue(storage.flush())
+        self.assertEqual(self._on_disk()["total"], {"5": 3})
+        streaks_on_disk = json.loads((self.storage.STORAGE_DIR / "streaks.json").read_text(encoding="utf-8"))
+        self.assertEqual(streaks_on_disk, {"5": {"games": {}}})
+        self.assertEqual(storage.dirty, 0)
+
+    def test_write_happens_outside_the_lock_and_never_inline(self):
+        store = self.storage.configure_store(flush_interval=0, flush_every=1)
+        storage = self.storage.get_storage()
+
+        store.set_user("1", {"display": "a"})
+        # и интервал истёк, и порог набран — но пишет только фоновая задача
+        self.assertFalse(self.storage.SCORES_FILE.exists())
+
+        lock_free = []
+        atomic_write = self.storage._atomic_write
+
+        def probe(*args, **kwargs):
+            # другой поток должен свободно брать лок, пока идёт запись файла
+            def try_lock():
+                acquired = storage.lock.acquire(timeout=1)
+                lock_free.append(acquired)
+                if acquired:
+                    storage.lock.release()
+
+            t = threading.Thread(target=try_lock)
+            t.start()
+            t.join()
+            atomic_write(*args, **kwargs)
+
+        self.storage._atomic_write = probe
+        try:
+            self.assertTrue(self.storage.flush_scores())
+        finally:
+            self.storage._atomic_write = atomic_write
+        self.assertEqual(lock_free, [True])
+        self.assertEqual(self._on_disk()["users"], {"1": {"display": "a"}})
+
+    def test_corrupt_file_is_moved_aside_not_overwritten(self):
+        self.storage.STORAGE_DIR.mkdir()
+        broken = b'{"users": {}, "total": {"1": 500'
+        self.storage.SCORES_FILE.write_bytes(broken)
+        # нули после падения — не msgpack, а такой же битый файл
+        (self.storage.STORAGE_DIR / "streaks.json").write_bytes(b"\x00" * 32)
+        self.assertEqual(self.storage.namespace("streaks").load(), {})
+
+        with self.assertLogs("services.storage", "ERROR"):
+            self.storage.get_store().add_points("2", "2024-01-01", 3)
+        self.storage.flush_scores()
+
+        self.assertEqual(len(list(self.storage.STORAGE_DIR.glob("streaks.json.*.corrupt"))), 1)
+        corrupt = list(self.storage.STORAGE_DIR.glob("scores.json.*.corrupt"))
+        self.assertEqual(len(corrupt), 1)
+        self.assertEqual(corrupt[0].read_bytes(), broken)
+        self.assertEqual(self._on_disk()["total"], {"2": 3})
+
+
+if __name__ == "__main__":
+    unittest.main()
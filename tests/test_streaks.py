@@ -0,0 +1,58 @@
+import importlib
+import json
+import os
+import tempfile
+import unittest
+
+
+class StreakTableTestCase(unittest.TestCase):
+    def setUp(self):
+        self._cwd = os.getcwd()
+        self._tmp = tempfile.TemporaryDirectory()
+        os.chdir(self._tmp.name)
+
+        import services.storage as storage
+        import services.streaks as streaks
+
+        self.storage = importlib.reload(storage)
+        self.storage.configure_store(flush_interval=3600, flush_every=1000)
+        self.streaks = importlib.reload(streaks)
+
+    def tearDown(self):
+        os.chdir(self._cwd)
+        self._tmp.cleanup()
+
+    def _on_disk(self):
+        path = self.storage.STORAGE_DIR / "streaks.json"
+        return json.loads(path.read_text(encoding="utf-8"))
+
+    def test_updates_stay_in_memory_until_flush(self):
+        for _ in range(3):
+            result = self.streaks.update_streak(7, "quiz", True)
+        self.assertEqual(result, (3, 3, 1))
+        self.assertEqual(self.storage.get_storage().dirty, 0)
+        self.assertFalse((self.storage.STORAGE_DIR / "streaks.json").exists())
+
+        self.assertTrue(self.storage.flush_scores())
+        game = self._on_disk()["7"]["games"]["quiz"]
+        self.assertEqual((game["streak"], game["best"], game["day"]), (3, 3, self.streaks._today_key()))
+
+    def test_new_day_resets_streak_but_keeps_best(self):
+        self.streaks.update_streak(7, "tf", True)
+        self.streaks.update_streak(7, "tf", True)
+        self.streaks.get_table()._records["7"]["tf"].day -= 1
+
+        self.assertEqual(self.streaks.update_streak(7, "tf", True), (1, 2, 0))
+
+    def test_table_is_restored_from_file(self):
+        self.streaks.update_streak(7, "quiz", True)
+        self.streaks.update_streak(7, "quiz", True)
+        self.storage.flush_scores()
+
+        self.storage = importlib.reload(self.storage)
+        self.assertEqual(self.streaks.get_table().get("7", "quiz"), (2, 2))
+        self.assertEqual(self.streaks.update_streak(7, "quiz", False), (0, 2, 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,36 @@
+import unittest
+
+from services.throttle import FloodGuard
+
+
+class FloodGuardTestCase(unittest.TestCase):
+    def setUp(self):
+        self.now = 0.0
+        self.guard = FloodGuard(rate=2.0, burst=3, dedupe_window=1.0, clock=lambda: self.now)
+
+    def test_same_button_is_deduplicated(self):
+        self.assertTrue(self.guard.allow(1, "quiz:ans:5:0"))
+        self.assertFalse(self.guard.allow(1, "quiz:ans:5:0"))
+        self.assertTrue(self.guard.allow(2, "quiz:ans:5:0"))
+
+        self.now = 1.5
+        self.assertTrue(self.guard.allow(1, "quiz:ans:5:0"))
+
+    def test_bucket_limits_burst_and_refills(self):
+        allowed = [self.guard.allow(1, f"btn:{i}") for i in range(5)]
+        self.assertEqual(allowed, [True, True, True, False, False])
+
+        self.now = 0.5
+        self.assertTrue(self.guard.allow(1))
+        self.assertFalse(self.guard.allow(1))
+
+    def test_sweep_forgets_idle_users(self):
+        self.guard.allow(1, "menu:games")
+        self.now = 120.0
+        self.guard.allow(2)
+        self.assertEqual(set(self.guard._buckets), {2})
+        self.assertEqual(self.guard._recent, {})
+
+
+if __name__ == "__main__":
+    unittest.main()